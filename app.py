@@ -1,17 +1,12 @@
 import streamlit as st
-import pandas as pd
-import pydeck as pdk
-from datetime import datetime
-import yaml
 # import plotly.express as px
 # import statsmodels.api as sm
 
-from src.quality_checks import (
-    missing_values,
-    report_city_freshness, outliers
-)
+from src.dashboard_data import load_dashboard_artifacts, cached_filter
+from src.heatmap import get_temp_edges
+from src.analysis import get_time_series_window
 
-from src.analysis import(
+from src.charts import(
     load_and_filter_data,
     geographic_overview,
     time_series_analysis,
@@ -19,17 +14,17 @@ from src.analysis import(
     usage_patterns_heatmap,
 )
 
-# load weather and energy data
-df = pd.read_csv("./data/processed/weather_energy_data.csv")
+DATA_PATH = "./data/processed/weather_energy_data.csv"
+CONFIG_PATH = "./config/config.yaml"
+TEMP_EDGES = get_temp_edges(CONFIG_PATH)
+WINDOW_DAYS = get_time_series_window(CONFIG_PATH)
 
-# load cities data and store in dataframe
-with open("./config/config.yaml", "r") as file:
-    config = yaml.safe_load(file)
-    
-cities = config["cities"]
-df_cities = pd.DataFrame(cities)
+# aggregates precomputed by `python -m src.artifacts` after the pipeline run,
+# cached until the pipeline rewrites the file (or the config changes)
+artifacts = load_dashboard_artifacts(DATA_PATH, CONFIG_PATH)
+df = artifacts["daily"]
 
-data, df = load_and_filter_data(df, df_cities)
+data, df = load_and_filter_data(df, filter_data=cached_filter(DATA_PATH, CONFIG_PATH))
 
 
 
@@ -37,25 +32,28 @@ st.title(":blue[U.S Weather] & :red[Energy Dashboard]")
 
 # 1. Get geographic overview
 
-map = geographic_overview(data, df)
+map = geographic_overview(data, df, snapshot=artifacts["snapshot"])
 st.pydeck_chart(map)
 
 
 # 2. Time-series analysis
 st.subheader("Time Series Chart")
-fig = time_series_analysis(data)
+fig = time_series_analysis(data, window_days=WINDOW_DAYS)
 st.plotly_chart(fig, use_container_width=True)
 
 
 # 3. Correlation analysis
 
 st.subheader("Correlation")
-fig = correlation_analysis(data)
+fig = correlation_analysis(data, stats=artifacts["regression"])
 st.plotly_chart(fig, use_container_width=True)
 
 # 4. usage pattern heatmaps
 st.subheader("Usage Patterns Heatmap")
-fig = usage_patterns_heatmap(data)
+# the precomputed cube covers the whole history, use it unless the date range is narrowed
+full_range = data["date"].min() == df["date"].min() and data["date"].max() == df["date"].max()
+cube = artifacts["heatmap"] if full_range else None
+fig = usage_patterns_heatmap(data, cube=cube, edges=TEMP_EDGES)
 st.plotly_chart(fig, use_container_width=True)
 
 
@@ -64,16 +62,17 @@ st.plotly_chart(fig, use_container_width=True)
 st.header("_Data Quality Report_")
 
 st.subheader("Missing Values")
-missing_value = missing_values(df)
-st.dataframe(missing_value)
+st.dataframe(artifacts["missing"])
 
 st.subheader("Outliers")
-outlier = outliers(df)
-st.dataframe(outlier)
+st.dataframe(artifacts["outliers"])
 
 st.subheader("Data Freshness")
-data_freshness = report_city_freshness(df)
-st.dataframe(data_freshness)
+st.dataframe(artifacts["freshness"]["report"])
+
+# rows the pipeline's validation gate kept out of the raw data (data/quarantine)
+st.subheader("Quarantined Rows")
+st.dataframe(artifacts["freshness"]["quarantine"])
 
 
 
@@ -0,0 +1,224 @@
+"""
+Times each pipeline and dashboard stage on synthetic data and records its peak memory,
+then compares the results with a stored baseline.
+
+    python -m benchmarks.run --cities 100 --years 2                  # results/latest.json
+    python -m benchmarks.run --cities 100 --years 2 --save-baseline  # also results/baseline.json
+
+Exits 1 when a stage is slower (or uses more memory) than the baseline by more than
+--tolerance, or when a module import exceeds its budget in IMPORT_BUDGETS.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import subprocess
+
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_cities, synthetic_raw, write_config
+from src.storage import open_raw_stores
+from src.validation import validate_raw
+from src.transform import build_processed, add_deltas, read_processed
+from src.analysis import _merge_df, filter_frame, correlation_stats, per_city_fits, heatmap_matrix, latest_snapshot
+from src.quality_checks import run_quality_checks
+from src.artifacts import build_artifacts
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+# cold import time budget (seconds) of the modules the cron job and batch tools load;
+# the dashboard module pulls in streamlit / plotly and is only measured
+IMPORT_BUDGETS = {
+    "src.analysis": 1.0,
+    "src.artifacts": 1.0,
+    "weather_energy_pipeline": 1.5,
+    "src.charts": None,
+}
+
+
+def import_time(module, repeat=3):
+    """best cold import time of `module` in a fresh interpreter, without API credentials"""
+    env = {key: value for key, value in os.environ.items() if key not in ("NAOO_TOKEN", "EIA_KEY")}
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    best = None
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", code], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+        )
+        seconds = float(out.stdout.strip().splitlines()[-1])
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def measure(func, repeat=3):
+    """
+    (best wall time, peak traced MB, result); memory is taken from one extra traced run.
+    With repeat=1 (stages that must run once: writes, full builds) the single run is
+    both timed and traced, so its time includes the tracing overhead.
+    """
+    if repeat == 1:
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return seconds, peak / 2**20, result
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 2**20, result
+
+
+def run_benchmarks(n_cities, years, seed=0, backend="csv", repeat=3, workdir=None):
+    workdir = workdir or tempfile.mkdtemp(prefix="bench-")
+    cities = synthetic_cities(n_cities, seed)
+    weather, energy = synthetic_raw(cities, years, seed=seed)
+    config_path = write_config(workdir, cities, backend)
+    raw_dir = os.path.join(workdir, "raw")
+    processed_path = os.path.join(workdir, "weather_energy_data.csv")
+    stages = {}
+
+    def stage(name, func, rows, repeat=repeat):
+        seconds, peak_mb, result = measure(func, repeat)
+        stages[name] = {"seconds": round(seconds, 4), "peak_mb": round(peak_mb, 1), "rows": int(rows)}
+        print(f"  {name:<18} {seconds:>8.3f}s {peak_mb:>9.1f} MB  {rows:>9} rows")
+        return result
+
+    print(f"{n_cities} cities x {years} year(s): {len(weather)} weather + {len(energy)} energy raw rows ({workdir})")
+    stage("validate", lambda: (validate_raw("weather", weather), validate_raw("energy", energy)), len(weather) + len(energy))
+
+    def append():
+        # a fresh store every time (csv files, key index and parquet parts), so each run writes everything
+        for name in os.listdir(raw_dir) if os.path.isdir(raw_dir) else []:
+            if name.endswith((".csv", ".keys")):
+                os.remove(os.path.join(raw_dir, name))
+        shutil.rmtree(os.path.join(raw_dir, "parquet"), ignore_errors=True)
+        os.makedirs(raw_dir, exist_ok=True)
+        weather_store, energy_store = open_raw_stores(config_path, raw_dir)
+        weather_store.append(weather)
+        energy_store.append(energy)
+        return weather_store, energy_store
+    # timed once, a repeat would measure a second (deduplicated) write
+    weather_store, energy_store = stage("raw_append", append, len(weather) + len(energy), repeat=1)
+
+    processed = stage("pivot_merge", lambda: build_processed(weather_store, energy_store), len(weather) + len(energy))
+    processed = stage("deltas", lambda: add_deltas(processed), len(processed))
+    stage("processed_write", lambda: processed.to_csv(processed_path, index=False), len(processed))
+
+    def load():
+        coordinates = pd.DataFrame(cities)[["city", "state", "Latitude", "Longitude"]]
+        return _merge_df(read_processed(processed_path), coordinates)
+    df = stage("load", load, len(processed))
+    stages["load"]["bytes_per_row"] = round(df.memory_usage(deep=True).sum() / max(len(df), 1), 1)
+    dates = df["date"].sort_values().unique()
+    selected = sorted(df["city"].unique())[: max(1, n_cities // 2)]
+    data = stage(
+        "filter", lambda: filter_frame(df, dates[len(dates) // 4], dates[-1], selected), len(df)
+    )
+    stage("correlation", lambda: per_city_fits(correlation_stats(data)[1]), len(data))
+    stage("heatmap", lambda: heatmap_matrix(data, selected), len(data))
+    stage("quality", lambda: run_quality_checks(df), len(df))
+    stage("snapshot", lambda: latest_snapshot(df), len(df))
+    stage(
+        "artifacts",
+        lambda: build_artifacts(processed_path, config_path, os.path.join(workdir, "artifacts")),
+        len(processed), repeat=1,
+    )
+
+    imports = {}
+    for module in IMPORT_BUDGETS:
+        imports[module] = round(import_time(module), 4)
+        print(f"  import {module:<28} {imports[module]:>7.3f}s")
+
+    return {
+        "meta": {
+            "cities": n_cities,
+            "years": years,
+            "seed": seed,
+            "backend": backend,
+            "raw_rows": len(weather) + len(energy),
+            "processed_rows": len(processed),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "run_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "stages": stages,
+        "imports": imports,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """list of regressions: stages slower / bigger than baseline * (1 + tolerance), import budgets"""
+    problems = []
+    shape = ("cities", "years", "backend")
+    if baseline is not None and any(baseline["meta"].get(key) != results["meta"][key] for key in shape):
+        problems.append("baseline was recorded with other --cities / --years / --backend, stages not compared")
+    elif baseline is not None:
+        for name, current in results["stages"].items():
+            before = baseline["stages"].get(name)
+            if before is None:
+                continue
+            for metric in ("seconds", "peak_mb"):
+                if before[metric] > 0 and current[metric] > before[metric] * (1 + tolerance):
+                    problems.append(
+                        f"{name} {metric}: {current[metric]} vs baseline {before[metric]} "
+                        f"(+{(current[metric] / before[metric] - 1) * 100:.0f}%)"
+                    )
+    for module, budget in IMPORT_BUDGETS.items():
+        if budget is not None and results["imports"][module] > budget:
+            problems.append(f"import {module}: {results['imports'][module]:.3f}s over the {budget}s budget")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline and dashboard stages on synthetic data")
+    parser.add_argument("--cities", type=int, default=20)
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", default=os.path.join(RESULTS_DIR, "latest.json"))
+    parser.add_argument("--baseline", default=os.path.join(RESULTS_DIR, "baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.cities, args.years, args.seed, args.backend, args.repeat)
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.out}")
+
+    baseline = None
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    problems = compare(results, baseline, args.tolerance)
+    for problem in problems:
+        print(f"⚠️ {problem}")
+    if not problems and not args.save_baseline:
+        print("No regressions." if baseline is not None else "No baseline to compare with (use --save-baseline).")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
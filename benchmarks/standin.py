@@ -0,0 +1,251 @@
+"""
+Local stand-in for the NOAA GHCND and EIA v2 APIs, for load testing the fetch layer
+without network access or real keys. Responses are generated from the request
+(station / respondent, type, timezone and dates) with seeded values, paginated like
+the real APIs, and can be slowed down or broken on purpose.
+
+    python -m benchmarks.standin --port 8765 --latency 0.05 --error-429 0.02 --error-503 0.02 --truncate 0.01
+    NOAA_BASE_URL=http://127.0.0.1:8765/cdo-web/api/v2 EIA_BASE_URL=http://127.0.0.1:8765/v2 \\
+        NAOO_TOKEN=x EIA_KEY=x python weather_energy_pipeline.py
+
+GET /__stats returns the request counts per API and status.
+"""
+import json
+import time
+import functools
+import zlib
+import random
+import argparse
+import datetime
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import numpy as np
+import pandas as pd
+
+NOAA_PATH = "/cdo-web/api/v2/data"
+EIA_PATH = "/v2/electricity/rto/daily-region-data/data"
+NOAA_MAX_LIMIT = 1000
+EIA_MAX_LENGTH = 5000
+TYPE_NAMES = {"D": "Demand", "NG": "Net generation"}
+
+
+def _noise(key, days, seed):
+    """deterministic pseudo-random values in [-1, 1) per (key, day), no state to keep"""
+    offset = (zlib.crc32(key.encode()) + seed * 7919) % 100000
+    x = np.sin((days + offset) * 12.9898 + offset * 78.233) * 43758.5453
+    return (x - np.floor(x)) * 2 - 1
+
+
+def _days(start, end, last_day):
+    end = min(pd.Timestamp(end), pd.Timestamp(last_day))
+    return pd.date_range(pd.Timestamp(start).normalize(), end.normalize(), freq="D")
+
+
+@functools.lru_cache(maxsize=64)
+def ghcnd_rows(station, start, end, last_day, seed=0):
+    """GHCND-shaped TMAX / TMIN results for one station, ordered by date then datatype (cached per request)"""
+    dates = _days(start, end, last_day)
+    if dates.empty:
+        return []
+    days = (dates - pd.Timestamp("2000-01-01")).days.to_numpy()
+    base = 50 + 20 * _noise(station, np.zeros(1), seed)[0]
+    tavg = base + 20 * np.cos(2 * np.pi * (dates.dayofyear.to_numpy() - 200) / 365.25) + 6 * _noise(station, days, seed)
+    spread = 15 + 5 * _noise(station + "/spread", days, seed)
+    stamps = dates.strftime("%Y-%m-%dT00:00:00")
+    rows = []
+    for stamp, high, low in zip(stamps, np.round(tavg + spread / 2), np.round(tavg - spread / 2)):
+        rows.append({"date": stamp, "datatype": "TMAX", "station": station, "attributes": ",,W,2400", "value": float(high)})
+        rows.append({"date": stamp, "datatype": "TMIN", "station": station, "attributes": ",,W,2400", "value": float(low)})
+    return rows
+
+
+@functools.lru_cache(maxsize=32)
+def eia_rows(respondents, types, timezones, start, end, last_day, seed=0):
+    """
+    EIA daily-region-data rows, sorted period desc, respondent, type, timezone asc.
+    Cached, since every page of a request asks for the same rows (facets as tuples).
+    """
+    dates = _days(start, end, last_day)[::-1]
+    if dates.empty:
+        return []
+    days = (dates - pd.Timestamp("2000-01-01")).days.to_numpy()
+    periods = dates.strftime("%Y-%m-%d")
+    season = np.abs(np.cos(2 * np.pi * (dates.dayofyear.to_numpy() - 200) / 365.25))
+    rows = []
+    series = {}
+    for respondent in sorted(respondents):
+        scale = 1e5 * (1 + 20 * (_noise(respondent, np.zeros(1), seed)[0] + 1))
+        for type in sorted(types):
+            factor = 1.0 if type == "D" else 1 + 0.2 * _noise(respondent + "/ng", np.zeros(1), seed)[0]
+            values = scale * factor * (1 + 0.3 * season + 0.05 * _noise(respondent + type, days, seed))
+            series[(respondent, type)] = np.round(values).astype(np.int64)
+    for i, period in enumerate(periods):
+        for respondent in sorted(respondents):
+            for type in sorted(types):
+                for timezone in sorted(timezones):
+                    rows.append({
+                        "period": period,
+                        "respondent": respondent,
+                        "respondent-name": f"{respondent} (stand-in)",
+                        "type": type,
+                        "type-name": TYPE_NAMES.get(type, type),
+                        "timezone": timezone,
+                        "timezone-description": timezone,
+                        "value": str(series[(respondent, type)][i]),
+                        "value-units": "megawatthours",
+                    })
+    return rows
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    server_version = "standin/1.0"
+
+    def log_message(self, format, *args):
+        pass   # thousands of requests per load test, counts are in /__stats
+
+    def _send(self, status, body, headers=None, truncate=False):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        # a truncated page announces the full length and stops half way, like a dropped connection
+        self.wfile.write(data[: len(data) // 2] if truncate else data)
+        if truncate:
+            self.close_connection = True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = url.path.rstrip("/")
+        query = parse_qs(url.query)
+        server = self.server
+        if path == "/__stats":
+            return self._send(200, server.stats_snapshot())
+        api = "noaa" if path == NOAA_PATH else "eia" if path == EIA_PATH else None
+        if api is None:
+            return self._send(404, {"error": f"unknown path {url.path}"})
+
+        fault = server.draw_fault()
+        if server.latency:
+            time.sleep(max(0.0, server.latency + random.uniform(-server.jitter, server.jitter)))
+        if fault == 429:
+            server.count(api, 429)
+            return self._send(429, {"error": "rate limited"}, {"Retry-After": str(server.retry_after)})
+        if fault == 503:
+            server.count(api, 503)
+            return self._send(503, {"error": "service unavailable"})
+
+        status, body = self._noaa(query) if api == "noaa" else self._eia(query)
+        server.count(api, status if fault != "truncate" else "truncated")
+        self._send(status, body, truncate=fault == "truncate")
+
+    def _noaa(self, query):
+        if not self.headers.get("token"):
+            return 400, {"status": "400", "message": "Token parameter is required."}
+        first = lambda key, default=None: (query.get(key) or [default])[0]
+        limit = min(int(first("limit", 25)), NOAA_MAX_LIMIT)
+        offset = max(int(first("offset", 1)), 1)
+        rows = ghcnd_rows(first("stationid", ""), first("startdate"), first("enddate"), self.server.last_day, self.server.seed)
+        if not rows:
+            return 200, {}
+        return 200, {
+            "metadata": {"resultset": {"offset": offset, "count": len(rows), "limit": limit}},
+            "results": rows[offset - 1: offset - 1 + limit],
+        }
+
+    def _eia(self, query):
+        if not query.get("api_key"):
+            return 403, {"error": {"code": "API_KEY_MISSING", "message": "No api_key was supplied."}}
+        first = lambda key, default=None: (query.get(key) or [default])[0]
+        length = min(int(first("length", EIA_MAX_LENGTH)), EIA_MAX_LENGTH)
+        offset = int(first("offset", 0))
+        rows = eia_rows(
+            tuple(query.get("facets[respondent][]", [])), tuple(query.get("facets[type][]", [])),
+            tuple(query.get("facets[timezone][]", [])), first("start"), first("end"),
+            self.server.last_day, self.server.seed,
+        )
+        return 200, {"response": {"total": str(len(rows)), "data": rows[offset: offset + length]}}
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, last_day=None, seed=0, latency=0.0, jitter=0.0,
+                 error_429=0.0, error_503=0.0, truncate=0.0, retry_after=1):
+        super().__init__(address, StandinHandler)
+        self.last_day = last_day or str(datetime.date.today())
+        self.seed = seed
+        self.latency = latency
+        self.jitter = jitter
+        self.faults = [(429, error_429), (503, error_503), ("truncate", truncate)]
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def draw_fault(self):
+        with self._lock:
+            draw = self._random.random()
+        for fault, rate in self.faults:
+            if draw < rate:
+                return fault
+            draw -= rate
+        return None
+
+    def count(self, api, status):
+        with self._lock:
+            key = f"{api} {status}"
+            self._stats[key] = self._stats.get(key, 0) + 1
+
+    def stats_snapshot(self):
+        with self._lock:
+            return dict(self._stats)
+
+    @property
+    def base_urls(self):
+        host, port = self.server_address[:2]
+        return {"noaa": f"http://{host}:{port}/cdo-web/api/v2", "eia": f"http://{host}:{port}/v2"}
+
+
+def start_standin(port=0, **options):
+    """runs a StandinServer on a background thread; port 0 picks a free port. Call .shutdown() to stop."""
+    server = StandinServer(("127.0.0.1", port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve stand-in NOAA GHCND and EIA v2 responses")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--last-day", default=None, help="latest date with data (default today)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="± seconds of random latency")
+    parser.add_argument("--error-429", type=float, default=0.0, help="share of requests answered 429")
+    parser.add_argument("--error-503", type=float, default=0.0, help="share of requests answered 503")
+    parser.add_argument("--truncate", type=float, default=0.0, help="share of responses cut off half way")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429")
+    args = parser.parse_args(argv)
+
+    server = StandinServer(
+        ("127.0.0.1", args.port), last_day=args.last_day, seed=args.seed, latency=args.latency,
+        jitter=args.jitter, error_429=args.error_429, error_503=args.error_503,
+        truncate=args.truncate, retry_after=args.retry_after,
+    )
+    urls = server.base_urls
+    print(f"Serving on 127.0.0.1:{args.port}")
+    print(f"  NOAA_BASE_URL={urls['noaa']} EIA_BASE_URL={urls['eia']}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Seeded NOAA- and EIA-shaped raw data for N cities x Y years, laid out like
+data/raw (all_weather.csv, all_energy.csv) plus a config.yaml listing the cities.
+
+    python -m benchmarks.synthetic --cities 100 --years 2 --out /tmp/bench
+"""
+import os
+import argparse
+
+import yaml
+import numpy as np
+import pandas as pd
+
+TIMEZONES = ["Eastern", "Central", "Mountain", "Pacific"]
+STATES = ["New York", "Illinois", "Texas", "Arizona", "Washington", "Florida", "Ohio", "Georgia"]
+
+
+def synthetic_cities(n_cities, seed=0):
+    """config-style city entries with a station, EIA region, timezone and coordinates"""
+    rng = np.random.default_rng(seed)
+    cities = []
+    for i in range(n_cities):
+        cities.append({
+            "city": f"City {i:03d}",
+            "state": STATES[i % len(STATES)],
+            "station": f"GHCND:USW{i:08d}",
+            "region": f"R{i:03d}",
+            "timezone": TIMEZONES[i % len(TIMEZONES)],
+            "Latitude": round(float(rng.uniform(25, 49)), 4),
+            "Longitude": round(float(rng.uniform(-124, -67)), 4),
+        })
+    return cities
+
+
+def synthetic_raw(cities, years=1, end="2025-12-31", seed=0):
+    """
+    (weather, energy) frames in the raw column layout. Temperatures follow a seasonal
+    curve per city with noise, demand rises with heating and cooling degrees, so the
+    regression and heatmap see realistic structure.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(end=pd.Timestamp(end), periods=365 * years, freq="D")
+    n_days, n_cities = len(dates), len(cities)
+    season = np.cos(2 * np.pi * (dates.dayofyear.to_numpy() - 200) / 365.25)
+
+    # one row per (day, city); the cities' climates differ by a base temperature and swing
+    base = rng.uniform(45, 75, n_cities)
+    swing = rng.uniform(10, 25, n_cities)
+    tavg = base[None, :] + swing[None, :] * season[:, None] + rng.normal(0, 5, (n_days, n_cities))
+    spread = rng.uniform(8, 22, (n_days, n_cities))
+    tmax, tmin = np.round(tavg + spread / 2), np.round(tavg - spread / 2)
+
+    degrees = np.abs(tavg - 65)
+    scale = rng.uniform(2e4, 2e6, n_cities)
+    demand = np.round(scale[None, :] * (1 + 0.012 * degrees + rng.normal(0, 0.03, (n_days, n_cities))))
+    net_gen = np.round(demand * rng.uniform(0.7, 1.3, n_cities)[None, :])
+
+    day = np.repeat(dates.strftime("%Y-%m-%d").to_numpy(), n_cities)
+    city_col = lambda key: np.tile(np.array([c[key] for c in cities], dtype=object), n_days)
+
+    weather = pd.concat([
+        pd.DataFrame({
+            "date": np.char.add(day.astype(str), "T00:00:00"),
+            "datatype": datatype,
+            "station": city_col("station"),
+            "attributes": ",,W,2400",
+            "value": values.ravel(),
+            "city": city_col("city"),
+            "state": city_col("state"),
+        })
+        for datatype, values in (("TMAX", tmax), ("TMIN", tmin))
+    ], ignore_index=True).sort_values(["city", "date", "datatype"], kind="stable", ignore_index=True)
+
+    energy = pd.concat([
+        pd.DataFrame({
+            "period": day,
+            "respondent": city_col("region"),
+            "respondent-name": np.char.add("Synthetic Operator ", city_col("region").astype(str)),
+            "type": type,
+            "type-name": type_name,
+            "timezone": city_col("timezone"),
+            "timezone-description": city_col("timezone"),
+            "value": values.ravel().astype(np.int64),
+            "value-units": "megawatthours",
+            "city": city_col("city"),
+            "state": city_col("state"),
+        })
+        for type, type_name, values in (("D", "Demand", demand), ("NG", "Net generation", net_gen))
+    ], ignore_index=True).sort_values(["city", "type", "period"], kind="stable", ignore_index=True)
+    return weather, energy
+
+
+def write_config(out_dir, cities, backend="csv"):
+    """config.yaml for the synthetic cities, raw stores and quarantine files under out_dir. Returns its path."""
+    os.makedirs(out_dir, exist_ok=True)
+    config_path = os.path.join(out_dir, "config.yaml")
+    with open(config_path, "w") as f:
+        yaml.safe_dump({
+            "cities": cities,
+            "storage": {
+                "backend": backend,
+                "parquet_root": os.path.join(out_dir, "raw", "parquet"),
+                "csv_export": True,
+            },
+            "processing": {"mode": "full"},
+            "validation": {"quarantine_root": os.path.join(out_dir, "quarantine")},
+        }, f, sort_keys=False)
+    return config_path
+
+
+def write_synthetic(out_dir, n_cities, years, seed=0, backend="csv"):
+    """
+    writes <out_dir>/raw/all_weather.csv, all_energy.csv and <out_dir>/config.yaml.
+    Returns the config path.
+    """
+    cities = synthetic_cities(n_cities, seed)
+    weather, energy = synthetic_raw(cities, years, seed=seed)
+    raw_dir = os.path.join(out_dir, "raw")
+    os.makedirs(raw_dir, exist_ok=True)
+    weather.to_csv(os.path.join(raw_dir, "all_weather.csv"), index=False)
+    energy.to_csv(os.path.join(raw_dir, "all_energy.csv"), index=False)
+    return write_config(out_dir, cities, backend)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write synthetic NOAA/EIA raw files")
+    parser.add_argument("--cities", type=int, default=10)
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="./data/synthetic")
+    args = parser.parse_args(argv)
+    config_path = write_synthetic(args.out, args.cities, args.years, args.seed)
+    print(f"Wrote {args.cities} cities x {args.years} year(s) to {args.out} ({config_path})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,660 +1,165 @@
-from webbrowser import get
-import yaml
-import pandas as pd
+"""
+Computations behind the dashboard views. Only pandas / numpy, no Streamlit or
+plotting imports, so the pipeline and batch jobs can use them headless; the
+rendering lives in src/charts.py.
+
+Every function here reads its input frame without modifying it and returns a new,
+small result (a few columns or one row per city), so the dashboard sessions can all
+share one cached copy of the data.
+"""
 import datetime
-import streamlit as st
-import pydeck as pdk
-import plotly.graph_objects as go
-import plotly.express as px
-import statsmodels.api as sm
+
+import yaml
 import numpy as np
+import pandas as pd
 
-def _get_pct_change(df):
-    df.sort_values(by=["city", "date"])
+from src.regression import sufficient_stats, fit, fit_by
+from src.heatmap import DEFAULT_TEMP_EDGES, build_heatmap_cube, heatmap_from_cube
+from src.transform import add_deltas, delta_columns, as_processed_schema
 
-    # Group by city and shift Demand column
-    df["Demand_yesterday"] = df.groupby("city")["Demand"].shift(1)
+# days up to the last date shown in the time series
+DEFAULT_WINDOW_DAYS = 90
 
-    # Calculate percentage change
-    df["Demand_pct_change"] = round(((df["Demand"] - df["Demand_yesterday"]) / df["Demand_yesterday"]) * 100, 2)
-    return df
-# Optional: same for Net generation
-# df["NetGen_yesterday"] = df.groupby("city")["Net generation"].shift(1)
-# df["NetGen_pct_change"] = ((df["Net generation"] - df["NetGen_yesterday"]) / df["NetGen_yesterday"]) * 100
+
+def get_time_series_window(config_path):
+    """analysis.time_series_window_days in config.yaml (null = the whole range), or the default"""
+    with open(config_path) as f:
+        data = yaml.safe_load(f)
+    return (data.get("analysis") or {}).get("time_series_window_days", DEFAULT_WINDOW_DAYS)
+
+
+def _get_pct_change(df):
+    """
+    frame with the % change columns of the processed data (Demand_pct_change, ...).
+    Processed files written by the pipeline already carry them; older files get them
+    computed here, on a sorted copy, so the caller's frame is left as it is.
+    """
+    if set(delta_columns()) <= set(df.columns):
+        return df
+    return add_deltas(df)
 
 def _merge_df(df, cities):
     df_2 = cities[["city", "state", "Latitude", "Longitude"]].copy()
     merged_df = pd.merge(df, df_2, on=["city", "state"], how="inner")
-    return merged_df
+    # the keys come back as plain strings from the merge
+    return as_processed_schema(merged_df)
 
-# Function to load data and apply filters
-def load_and_filter_data(df, cities):
-    # Merge with city data
-    df = _merge_df(df, cities)
-    df["date"] = pd.to_datetime(df["date"])
-    
-    # Sidebar filters
-    st.sidebar.header("Filters")
-    
-    # Date range selector
-    min_date = df["date"].min().date()
-    max_date = df["date"].max().date()
-    start_date, end_date = st.sidebar.date_input(
-        "Select Date Range",
-        value=[min_date, max_date],
-        min_value=min_date,
-        max_value=max_date
-    )
-    
-    # City filter (multiselect)
-    city_options = sorted(df["city"].unique())
-    selected_cities = st.sidebar.multiselect(
-        "Select Cities",
-        options=city_options,
-        default=city_options
-    )
-    
-    # Filter dataframe
+
+def filter_frame(df, start_date, end_date, cities):
+    """rows between start_date and end_date (inclusive) of the given cities"""
     mask = (
         (df["date"] >= pd.to_datetime(start_date)) &
         (df["date"] <= pd.to_datetime(end_date)) &
-        (df["city"].isin(selected_cities))
+        (df["city"].isin(cities))
     )
-    df_filtered = df.loc[mask]
-    
-    return df_filtered, df
+    return df.loc[mask]
 
 
+# columns the map layer and its tooltip use
+MAP_COLUMNS = [
+    "date", "city", "state", "Latitude", "Longitude", "TMIN", "TMAX",
+    "Demand", "value-units", "Demand_pct_change",
+]
 
 
+def latest_snapshot(df):
+    """
+    one row per city: its latest day with % change from yesterday and the map color
+    (green -> red by demand) as an [r, g, b, a] list, so the map draws O(cities) points
+    """
+    data = _get_pct_change(df)
+    # position of each city's latest row, only those rows are taken out of the frame
+    last = data["date"].reset_index(drop=True).groupby(data["city"].to_numpy(), sort=False).idxmax()
+    columns = [col for col in MAP_COLUMNS if col in data.columns]
+    latest = data.iloc[last.to_numpy()][columns].sort_values("city")
 
-# Visualization 1 - 
-# Function to create a geographic overview of cities
-def geographic_overview(filtered_df, df):
-    # get last date in data
-    last_date = df["date"].max()
-    
-    # calculate % change in demand
-    data = _get_pct_change(filtered_df)   
-    
-    
     # Normalize demand for color mapping
-    min_demand = data["Demand"].min()
-    max_demand = data["Demand"].max()
-    data["color_red"] = ((data["Demand"] - min_demand) / (max_demand - min_demand) * 255).astype(int)
-    data["color_green"] = (255 - data["color_red"]).astype(int)
-    data["color_blue"] = 0
-    data["color_alpha"] = 160
-    
-    
-    
-    st.write(f"Last updated: {last_date.date()}")
-    
-    # Define layer
-    layer = pdk.Layer(
-        "ScatterplotLayer",
-        data=data,
-        get_position="[Longitude, Latitude]",
-        get_color="[color_red, color_green, color_blue, color_alpha,]",
-        get_radius=120000,
-        pickable=True
-    )
-
-    # Set the initial view
-    view_state = pdk.ViewState(
-        latitude=data["Latitude"].mean(),
-        longitude=data["Longitude"].mean(),
-        zoom=3,
-        pitch=50
-    )
-
-    tooltip = {
-    "html": "<b>{city}, {state}</b><br/>"
-            "Temperature: {TMIN}°F - {TMAX}°F<br/>"
-            "Energy Usage: {Demand} {value-units}<br/>"
-            "% Change from yesterday: {Demand_pct_change}%",
-    "style": {"backgroundColor": "steelblue", "color": "white"}
-    }
-
-    
-    
-    # Create and show chart
-    r = pdk.Deck(layers=[layer], initial_view_state=view_state, tooltip=tooltip)
-
-    return r
+    demand = latest["Demand"].to_numpy(dtype=float)
+    low, high = (np.nanmin(demand), np.nanmax(demand)) if np.isfinite(demand).any() else (0.0, 0.0)
+    red = np.nan_to_num((demand - low) / ((high - low) or 1) * 255).astype(int)
+    colors = np.column_stack([red, 255 - red, np.zeros_like(red), np.full_like(red, 160)])
+    return latest.assign(color=colors.tolist()).reset_index(drop=True)
 
 
-
-# visualization 2 - Function to create a time series analysis of energy usage and weather
-def time_series_analysis(data):
+def time_series_frame(data, city="All Cities", window_days=DEFAULT_WINDOW_DAYS):
     """
-    data, cities -> inputs you already pass (keeps your existing _merge_df usage).
-    Returns a Plotly figure with:
-      - TAVG (avg temp) on left axis
-      - Demand on right axis
-      - Weekend shading: Saturday = LightGray, Sunday = LightBlue
+    date, TAVG and Demand of one city (or the daily mean over all cities),
+    limited to the last `window_days` days (None = everything), in date order.
+    data -> processed rows in the canonical schema (read_processed), dates already parsed
     """
-    
-    
-    
-    # Ensure the 'date' column is datetime
-    data["date"] = pd.to_datetime(data["date"])
-    
-    # dropdown for city selection
-    cities = ["All Cities"] + sorted(data["city"].unique())
-    selected_city = st.selectbox("Select a city", cities)
-    
     # filter for city if not all cities
-    if selected_city != "All Cities":
-        df_filtered = data[data["city"] == selected_city].copy()
+    if city != "All Cities":
+        df_filtered = data.loc[data["city"] == city, ["date", "TAVG", "Demand"]]
     else:
         #group by date and average_values
-        df_filtered = data.groupby("date", as_index=False).agg({
-            "TAVG": "mean",
-            "Demand": "mean"
-        })
-    
-    
-    # calculate the date 90 days ago from today
-    last_date = df_filtered["date"].max()
-    ninety_days_ago = last_date - datetime.timedelta(days=90)
-    df_recent = df_filtered[df_filtered["date"] >= ninety_days_ago].sort_values("date")
-    
-    
-    if df_recent.empty:
-        st.warning("No data available for the selected city / date range.")
-        return go.Figure()
-    
-    
-    # create a plotly figure
-    fig = go.Figure()
-    
-    # add temperature trace (left side)
-    fig.add_trace(go.Scatter(
-        x=df_recent["date"],
-        y=df_recent["TAVG"],
-        name="Average Daily Temperature (°F)",
-        # mode="lines+markers",
-        mode="lines",
-        line=dict(color='firebrick', width=2),
-        yaxis="y1"
-    ))
-    
-    # add Energy demand trace (right axis)
-    fig.add_trace(go.Scatter(
-        x=df_recent["date"],
-        y=df_recent["Demand"],
-        name="Energy Demand",
-        # mode="lines+markers",
-        mode="lines",
-        line=dict(color='royalblue', width=2, dash="dot"), 
-        yaxis="y2"
-    ))
-    
-     # 🔹 Weekend shading: Loop through dates and add rectangles for Sat/Sun
-    for date in pd.date_range(df_recent["date"].min(), df_recent["date"].max()):
-        weekday = date.weekday()
-        
-        if weekday == 5:
-            fillcolor = "LightGray"
-            opacity= 0.25
-        elif weekday == 6:
-            fillcolor="LightBlue"
-            opacity = 0.18
-        else:
-            continue 
-            
-        fig.add_shape(
-            type="rect",
-            x0=date,  
-            x1=date + datetime.timedelta(days=1),
-            y0=0, y1=1,  # Normalized coordinates for full height
-            xref="x",
-            yref="paper",  # "paper" means relative to chart height
-            fillcolor=fillcolor,
-            opacity=opacity,
-            layer="below",
-            line_width=0
-            )
-    
-    
-    
-    fig.update_layout(
-        title=f"Temperature vs Energy Demand - {selected_city}",
-        xaxis=dict(title="Date"),
-        yaxis=dict(title="Temperature (°F)", side="left"),
-        yaxis2=dict(title="Energy Demand (MWh)", side="right", overlaying="y"),
-        legend=dict(x=0.01, y=0.99, bgcolor="rgba(255,255,255,0)"),
-        template="plotly_white",
-        hovermode="x unified"
-    )
-    
-    return fig
-
-
-def correlation_analysis(data):
-    
-    data["date"] = pd.to_datetime(data["date"])
-    
-    # Dropdown: city selection
-    city_options = ["All Cities"] + sorted(data["city"].unique())
-    selected_city = st.selectbox("Select a city for correlation analysis", city_options)
-    
-    if selected_city != "All Cities":
-        df_filtered = data[data["city"] == selected_city]
-    else:
-        df_filtered = data.copy()
-    
-    # X = Temperature, Y = Energy Demand
-    X = df_filtered["TAVG"]
-    y = df_filtered["Demand"]
-    
-    # Regression model
-    X_with_const = sm.add_constant(X)  # adds intercept term
-    model = sm.OLS(y, X_with_const).fit()
-    
-    slope = model.params["TAVG"]
-    intercept = model.params["const"]
-    r_squared = model.rsquared
-    corr_coef = np.corrcoef(X, y)[0, 1]
-    
-    # Regression line values
-    x_vals = np.linspace(X.min(), X.max(), 100)
-    y_pred = intercept + slope * x_vals
-    
-    # Scatter plot with city colors
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=df_filtered["TAVG"],
-        y=df_filtered["Demand"],
-        mode="markers",
-        marker=dict(
-            size=7,
-            color=df_filtered["city"].astype('category').cat.codes,
-            colorscale="Viridis",
-            showscale=True
-        ),
-        text=df_filtered.apply(lambda row: f"{row['city']}, {row['state']}<br>Date: {row['date'].date()}<br>TAVG: {row['TAVG']}°F<br>Demand: {row['Demand']} MWh", axis=1),
-        hoverinfo="text",
-        name="Data Points"
-    ))
-    
-    # Add regression line
-    fig.add_trace(go.Scatter(
-        x=x_vals,
-        y=y_pred,
-        mode="lines",
-        line=dict(color="red", width=2),
-        name=f"Regression Line: y = {intercept:.2f} + {slope:.2f}x"
-    ))
-    
-    # Layout
-    fig.update_layout(
-        title=f"Temperature vs Energy Demand - {selected_city}",
-        xaxis_title="Average Temperature (°F)",
-        yaxis_title="Energy Demand (MWh)",
-        template="plotly_white",
-        legend=dict(x=0.01, y=0.99)
-    )
-    
-    # Show stats
-    st.write(f"**Slope:** {slope:.2f}  |  **Intercept:** {intercept:.2f}")
-    st.write(f"**R²:** {r_squared:.3f}  |  **Correlation (r):** {corr_coef:.3f}")
-    
-    return fig
+        df_filtered = data.groupby("date", as_index=False)[["TAVG", "Demand"]].mean()
 
+    # keep the last `window_days` days
+    if window_days is not None:
+        last_date = df_filtered["date"].max()
+        window_start = last_date - datetime.timedelta(days=window_days)
+        df_filtered = df_filtered[df_filtered["date"] >= window_start]
+    return df_filtered.sort_values("date")
 
 
-import pandas as pd
-import plotly.express as px
-import streamlit as st
-import numpy as np
-
-def usage_patterns_heatmap(data):
-    # --- prep & sidebar ---
-    df = data.copy()
-    df["date"] = pd.to_datetime(df["date"])
+def downsample(df, max_points, seed=0):
+    """random sample of about max_points rows, taken per city so every city stays visible"""
+    if max_points is None or len(df) <= max_points:
+        return df
+    frac = max_points / len(df)
+    return df.groupby("city", group_keys=False, observed=True).sample(frac=frac, random_state=seed)
 
-    # Dropdown for city
-    city_options = ["All Cities"] + sorted(data["city"].unique())
-    selected_city = st.selectbox("Select a city for heatmap", city_options)
 
-    if selected_city != "All Cities":
-        df = data[data["city"] == selected_city].copy()
+def correlation_stats(df_filtered, stats=None):
+    """
+    regression of Demand on TAVG over df_filtered -> (fit dict, sufficient stats used).
+    stats -> optional precomputed sufficient_stats per (city, date); the fit then only sums
+             the rows of the selected cities and dates instead of refitting the data
+    """
+    # Regression model: closed form from the sums n, Σx, Σy, Σxy, Σx², Σy²
+    if stats is not None:
+        selected = stats[
+            stats["city"].isin(df_filtered["city"].unique()) &
+            stats["date"].between(df_filtered["date"].min(), df_filtered["date"].max())
+        ]
     else:
-        df = data.copy()
-
-
-    
-    # --- bins: define labels once (cold->hot) + display order (hot->cold) ---
-    temp_bins = [-float("inf"), 50, 60, 70, 80, 90, float("inf")]
-    temp_labels_asc = ["<50°F", "50-60°F", "60-70°F", "70-80°F", "80-90°F", ">90°F"]   # cold -> hot
-    temp_labels_desc = [">90°F", "80-90°F", "70-80°F", "60-70°F", "50-60°F", "<50°F"]  # hot -> cold (display)
-
-    # bin and then set the categorical order to HOT->COLD for display
-    df["TempRange"] = pd.cut(df["TAVG"], bins=temp_bins, labels=temp_labels_asc)
-    df["TempRange"] = pd.Categorical(df["TempRange"], categories=temp_labels_desc, ordered=True)
-
-    # day ordering (Mon->Sun)
-    day_order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    df["DayOfWeek"] = pd.Categorical(df["date"].dt.day_name(), categories=day_order, ordered=True)
-
-    # --- pivot in the exact display order (hot->cold rows, Mon->Sun cols) ---
-    heatmap_pivot = (
-        df.pivot_table(index="TempRange", columns="DayOfWeek", values="Demand", aggfunc="mean")
-          .reindex(index=temp_labels_desc, columns=day_order)
-    )
-
-    # --- plot: NO axis reversal; first row (>90°F) will be at the top ---
-    fig = px.imshow(
-        heatmap_pivot,
-        color_continuous_scale="YlOrRd",        # low=light, high=red
-        aspect="auto",
-        labels=dict(color="Avg Energy Demand (MWh)"),
-        text_auto=".1f",
-        origin="upper"                          # keeps first index row at the top
-    )
-
-    fig.update_layout(
-        title="Usage Patterns by Temperature & Day of Week",
-        xaxis_title="Day of Week",
-        yaxis_title="Temperature Range (hot → cold)",
-        coloraxis_colorbar=dict(title="Avg Energy Demand (MWh)"),
-        margin=dict(l=80, r=40, t=70, b=40),
-    )
-
-    return fig
-
+        selected = sufficient_stats(df_filtered, x="TAVG", y="Demand")
+    return fit(selected), selected
 
-# def usage_patterns_heatmap(data):
-#     # Ensure date is datetime
-#     data["date"] = pd.to_datetime(data["date"])
 
-    # # Dropdown for city
-    # city_options = ["All Cities"] + sorted(data["city"].unique())
-    # selected_city = st.selectbox("Select a city for heatmap", city_options)
+def per_city_fits(selected):
+    """one fit per city from the same sums, for the stats table"""
+    return fit_by(selected, by="city")[["city", "slope", "intercept", "r_squared", "r"]]
 
-    # if selected_city != "All Cities":
-    #     df_filtered = data[data["city"] == selected_city].copy()
-    # else:
-    #     df_filtered = data.copy()
 
-#     # Define temperature bins and ordered categorical type (important for axis order)
-#     temp_bins = [-float("inf"), 50, 60, 70, 80, 90, float("inf")]
-#     temp_labels = ["<50°F", "50-60°F", "60-70°F", "70-80°F", "80-90°F", ">90°F"]
+# columns of the correlation scatter points (position and tooltip)
+POINT_COLUMNS = ["city", "state", "date", "TAVG", "Demand"]
 
-#     df_filtered["TempRange"] = pd.cut(df_filtered["TAVG"], bins=temp_bins, labels=temp_labels)
-#     # Make TempRange an ordered categorical so the pivot keeps correct order
-#     df_filtered["TempRange"] = pd.Categorical(df_filtered["TempRange"], categories=temp_labels, ordered=True)
 
-#     # Extract day of week and force consistent ordering for columns
-#     df_filtered["DayOfWeek"] = df_filtered["date"].dt.day_name()
-#     day_order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-#     df_filtered["DayOfWeek"] = pd.Categorical(df_filtered["DayOfWeek"], categories=day_order, ordered=True)
-
-#     # Group and calculate average demand. Use pivot_table to ensure missing combos exist.
-#     heatmap_pivot = (
-#         df_filtered
-#         .pivot_table(index="TempRange", columns="DayOfWeek", values="Demand", aggfunc="mean")
-#         .reindex(index=temp_labels, columns=day_order)   # enforce exact ordering
-#     )
-
-#     # Optionally fill NaN with np.nan (leave blank) or 0 — choose based on preference.
-#     # Here we keep NaN so empty cells are visually distinct.
-#     # heatmap_pivot = heatmap_pivot.fillna(0)
-
-#     # Plotly heatmap: use sequential "hot" scale so low=blue-ish, high=red/orange.
-#     fig = px.imshow(
-#         heatmap_pivot,
-#         color_continuous_scale="YlOrRd",   # sequential hot scale (blue->red not reversed)
-#         aspect="auto",
-#         labels=dict(color="Avg Energy Demand (MWh)"),
-#         text_auto=".1f",
-#         origin="upper"                      # first index (<50°F) will appear at top
-#     )
-
-#     # Improve layout and add explicit colorbar title
-#     fig.update_layout(
-#         title=f"Usage Patterns by Temperature & Day of Week - {selected_city}",
-#         xaxis_title="Day of Week",
-#         yaxis_title="Temperature Range",
-#         coloraxis_colorbar=dict(title="Avg Energy Demand (MWh)")
-#     )
-
-#     return fig
-
-
-
-
-# def usage_patterns_heatmap(data):
-    
-#     data["date"] = pd.to_datetime(data["date"])
-    
-#     # Dropdown for city
-#     city_options = ["All Cities"] + sorted(data["city"].unique())
-#     selected_city = st.selectbox("Select a city for heatmap", city_options)
-    
-#     if selected_city != "All Cities":
-#         df_filtered = data[data["city"] == selected_city]
-#     else:
-#         df_filtered = data.copy()
-    
-#     # Create temperature bins
-#     temp_bins = [-float("inf"), 50, 60, 70, 80, 90, float("inf")]
-#     temp_labels = ["<50°F", "50-60°F", "60-70°F", "70-80°F", "80-90°F", ">90°F"]
-#     df_filtered["TempRange"] = pd.cut(df_filtered["TAVG"], bins=temp_bins, labels=temp_labels)
-    
-#     # Extract day of week
-#     df_filtered["DayOfWeek"] = df_filtered["date"].dt.day_name()
-    
-#     # Group and calculate average demand
-#     heatmap_data = df_filtered.groupby(["TempRange", "DayOfWeek"])["Demand"].mean().reset_index()
-    
-#     # Pivot for heatmap
-#     heatmap_pivot = heatmap_data.pivot(index="TempRange", columns="DayOfWeek", values="Demand")
-    
-#     # Ensure consistent day order
-#     day_order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-#     heatmap_pivot = heatmap_pivot[day_order]
-    
-#     # Plotly heatmap
-#     fig = px.imshow(
-#         heatmap_pivot,
-#         color_continuous_scale="RdBu_r",
-#         aspect="auto",
-#         labels=dict(color="Avg Energy Demand (MWh)"),
-#         text_auto=".1f"  # show demand values in each cell
-#     )
-    
-#     fig.update_layout(
-#         title=f"Usage Patterns by Temperature & Day of Week - {selected_city}",
-#         xaxis_title="Day of Week",
-#         yaxis_title="Temperature Range",
-#         coloraxis_colorbar=dict(title="Avg Energy Demand (MWh)")
-#     )
-    
-#     return fig
-
-
-
-
-# def correlation_analysis(data, cities):
-    # Merge data and ensure correct types
-    # df = _merge_df(data, cities)
-    # df["date"] = pd.to_datetime(df["date"])
-
-    # # Keep only necessary columns
-    # df = df[["city", "TAVG", "Demand", "date"]].dropna()
-
-    # # Regression model
-    # X = df["TAVG"]
-    # y = df["Demand"]
-    # X_with_const = sm.add_constant(X)  # Adds intercept term
-    # model = sm.OLS(y, X_with_const).fit()
-
-    # # Extract regression stats
-    # slope = model.params["TAVG"]
-    # intercept = model.params["const"]
-    # r_squared = model.rsquared
-    # corr_coef = np.corrcoef(df["TAVG"], df["Demand"])[0, 1]
-
-    # # Create regression line points
-    # x_range = np.linspace(df["TAVG"].min(), df["TAVG"].max(), 100)
-    # y_pred = intercept + slope * x_range
-
-    # # Scatter plot with Plotly
-    # fig = px.scatter(
-    #     df,
-    #     x="TAVG",
-    #     y="Demand",
-    #     color="city",
-    #     hover_data={"date": True, "TAVG": True, "Demand": True}
-    # )
-
-    # # Add regression line
-    # fig.add_scatter(
-    #     x=x_range,
-    #     y=y_pred,
-    #     mode="lines",
-    #     name="Regression Line",
-    #     line=dict(color="white", width=2)
-    # )
-
-    # # Add equation and R² in layout
-    # fig.update_layout(
-    #     title=(
-    #         f"Temperature vs Energy Demand<br>"
-    #         f"y = {intercept:.2f} + {slope:.2f}x, "
-    #         f"R² = {r_squared:.3f}, r = {corr_coef:.3f}"
-    #     ),
-    #     xaxis_title="Average Temperature (°F)",
-    #     yaxis_title="Energy Demand (MWh)",
-    #     legend_title="City",
-    #     template="plotly_white"
-    # )
-
-    # return fig
-
-
-
-
-# st.sidebar.subheader("Map layers")
-
-
-#  Example: Load your CSV
-
-# # Ensure date is datetime
-# df["date"] = pd.to_datetime(df["date"])
-
-# # Compute % change from yesterday
-# df["pct_change"] = ((df["today_usage"] - df["yesterday_usage"]) / df["yesterday_usage"]) * 100
-
-# df["lat"] = df["city"].map(lambda c: city_coords[c][0])
-# df["lon"] = df["city"].map(lambda c: city_coords[c][1])
-
-# # Keep only the most recent date for each city
-# latest_df = df.sort_values("date").groupby("city").tail(1)
-
-# # Choose color scale based on usage
-# def usage_color(val):
-#     # Higher usage → more red; lower → more green
-#     max_usage = latest_df["today_usage"].max()
-#     min_usage = latest_df["today_usage"].min()
-#     ratio = (val - min_usage) / (max_usage - min_usage)
-#     r = int(255 * ratio)
-#     g = int(255 * (1 - ratio))
-#     return [r, g, 0]
-
-# latest_df["color"] = latest_df["today_usage"].apply(usage_color)
-
-
-# # Streamlit title and last updated time
-# st.title("US City Energy & Weather Overview")
-# last_update = latest_df["date"].max().strftime("%Y-%m-%d")
-# st.caption(f"Last updated: {last_update}")
-
-# # Create Pydeck layer
-# layer = pdk.Layer(
-#     "ScatterplotLayer",
-#     latest_df,
-#     get_position='[lon, lat]',
-#     get_fill_color="color",
-#     get_radius=50000,
-#     pickable=True
-# )
-
-# # Set the view
-# view_state = pdk.ViewState(
-#     latitude=39.5,
-#     longitude=-98.35,
-#     zoom=4,
-#     pitch=0
-# )
-
-# # Define tooltip
-# tooltip = {
-    # "html": "<b>{city}, {state}</b><br/>"
-            # "Temp: {max_temp}°F<br/>"
-            # "Energy Usage: {today_usage} MWh<br/>"
-            # "Change from yesterday: {pct_change}%",
-    # "style": {"backgroundColor": "steelblue", "color": "white"}
-# }
-
-
-
-# # Render in Streamlit
-# st.pydeck_chart(pdk.Deck(
-#     layers=[layer],
-#     initial_view_state=view_state,
-#     tooltip=tooltip
-# ))
+def correlation_view(data, city="All Cities", stats=None, max_points=None):
+    """
+    everything the correlation chart draws, for one city or all of them:
+      fit -> regression fit (correlation_stats), per_city -> per_city_fits (all cities only)
+      x_range -> (min, max) TAVG, points -> POINT_COLUMNS of the (downsampled) rows
+    """
+    rows = data[POINT_COLUMNS] if city == "All Cities" else data.loc[data["city"] == city, POINT_COLUMNS]
+    model, selected = correlation_stats(rows, stats)
+    tavg = rows["TAVG"].to_numpy(dtype=float)
+    return {
+        "fit": model,
+        "per_city": per_city_fits(selected) if city == "All Cities" else None,
+        "x_range": (np.nanmin(tavg), np.nanmax(tavg)) if np.isfinite(tavg).any() else (np.nan, np.nan),
+        "points": downsample(rows, max_points),
+    }
 
-# def time_series_3d(data, cities):
-#     # Merge and prepare the data
-#     df = _merge_df(data, cities)
-#     df["date"] = pd.to_datetime(df["date"])
-    
-#     # Dropdown city selector
-#     city_options = ["All Cities"] + sorted(df["city"].unique())
-#     selected_city = st.selectbox("Select a city for 3D view", city_options)
-    
-#     if selected_city != "All Cities":
-#         df_filtered = df[df["city"] == selected_city]
-#     else:
-#         df_filtered = (
-#             df.groupby("date", as_index=False)
-#               .agg({"TAVG": "mean", "Demand": "mean"})
-#         )
-    
-#     # Last 90 days
-#     ninety_days_ago = df["date"].max() - datetime.timedelta(days=90)
-#     df_recent = df_filtered[df_filtered["date"] >= ninety_days_ago]
-    
-#     # Create 3D scatter/line plot
-#     fig = go.Figure(data=[go.Scatter3d(
-#         x=df_recent["date"],          # X-axis: time
-#         y=df_recent["TAVG"],          # Y-axis: temperature
-#         z=df_recent["Demand"],        # Z-axis: energy demand
-#         mode='lines+markers',
-#         marker=dict(
-#             size=4,
-#             color=df_recent["Demand"],  # Color by demand
-#             colorscale='Viridis',
-#             opacity=0.8
-#         ),
-#         line=dict(color='royalblue', width=2)
-#     )])
-    
-#     fig.update_layout(
-#         scene=dict(
-#             xaxis_title='Date',
-#             yaxis_title='Temperature (°F)',
-#             zaxis_title='Energy Demand (MWh)',
-#             xaxis=dict(type='date')
-#         ),
-#         title=f"3D Time Series: Temperature vs Demand ({selected_city})",
-#         template="plotly_white"
-#     )
-    
-#     return fig
 
+def heatmap_matrix(data, cities, cube=None, edges=DEFAULT_TEMP_EDGES):
+    """
+    mean demand per temperature bin (rows hot -> cold) and weekday for the given cities.
+    cube -> optional precomputed build_heatmap_cube of the whole dataset; only valid when
+            `data` covers the full date range, the heatmap is then a sum over a few rows
+    """
+    if cube is None:
+        # same aggregation, done on the filtered rows of the selected cities only
+        cube = build_heatmap_cube(data.loc[data["city"].isin(cities), ["date", "city", "TAVG", "Demand"]], edges)
+    return heatmap_from_cube(cube, edges, cities=cities)
@@ -0,0 +1,234 @@
+"""
+Dashboard aggregates precomputed from the processed data: per-city daily series with
+% change, regression sums, the heatmap cube and the data quality reports. The cron job
+builds them after run_pipeline, the dashboard only reads them.
+
+    python -m src.artifacts            # rebuild the artifacts from the processed file
+    python -m src.artifacts --check    # exit 1 when they are missing or out of date
+"""
+import os
+import sys
+import json
+import argparse
+import datetime
+import tempfile
+
+import yaml
+import numpy as np
+import pandas as pd
+
+from src.analysis import _get_pct_change, _merge_df, latest_snapshot
+from src.regression import sufficient_stats
+from src.transform import key_index, read_processed
+from src.heatmap import build_heatmap_cube, get_temp_edges
+from src.quality_checks import QualityReport, get_quality_settings, run_quality_checks
+from src.validation import REQUIRED_COLUMNS, get_validation_settings, quarantine_summary
+
+DEFAULT_DIR = "./data/artifacts"
+PROCESSED_PATH = "./data/processed/weather_energy_data.csv"
+CONFIG_PATH = "./config/config.yaml"
+# artifact name -> file in the artifact directory
+FILES = {
+    "daily": "daily.csv",
+    "regression": "regression_stats.csv",
+    "heatmap": "heatmap_cube.csv",
+    "missing": "missing_values.csv",
+    "outliers": "outliers.csv",
+    "freshness": "freshness.json",
+    "snapshot": "latest_snapshot.json",
+}
+MANIFEST = "manifest.json"
+# bumped when the artifact layout changes, older artifacts are then rebuilt
+VERSION = 5
+# columns read back as datetimes; the daily series is read in the processed schema (read_processed)
+DATE_COLUMNS = {"regression": ["date"]}
+
+
+def file_signature(path):
+    """[mtime_ns, size] of a file: stored in the manifest, and part of the dashboard cache keys"""
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _write(folder, name, write):
+    """atomic write: readers see the previous file until the new one is complete"""
+    fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    os.close(fd)
+    write(tmp)
+    os.chmod(tmp, 0o644)   # mkstemp creates 0600, the dashboard may run as another user
+    os.replace(tmp, os.path.join(folder, name))
+
+
+def _write_csv(folder, name, df):
+    # float32 columns of the typed frames would be written in exponent notation (2.110785e+06)
+    wide = df.astype({col: "float64" for col in df.columns if df[col].dtype == np.float32})
+    _write(folder, name, lambda tmp: wide.to_csv(tmp, index=False))
+
+
+def _write_json(folder, name, data):
+    def write(tmp):
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=2)
+    _write(folder, name, write)
+
+
+def _city_coordinates(config_path):
+    with open(config_path) as f:
+        config = yaml.safe_load(f)
+    return pd.DataFrame(config["cities"])[["city", "state", "Latitude", "Longitude"]]
+
+
+def quarantine_signatures(config_path):
+    """file_signature of each validation quarantine file (None when absent), for the manifest and dashboard cache"""
+    root = get_validation_settings(config_path)["quarantine_root"]
+    paths = {kind: os.path.join(root, f"{kind}.csv") for kind in REQUIRED_COLUMNS}
+    return {kind: file_signature(path) if os.path.exists(path) else None for kind, path in paths.items()}
+
+
+def _write_quality(out_dir, report, quarantined):
+    """quarantined -> quarantine_summary of the rows the validation gate kept out of the raw data"""
+    _write_csv(out_dir, FILES["missing"], report.missing)
+    _write_csv(out_dir, FILES["outliers"], report.outliers)
+    freshness = report.freshness.assign(last_date=report.freshness["last_date"].dt.strftime("%Y-%m-%d"))
+    _write_json(out_dir, FILES["freshness"], {
+        "generated": str(report.checked_on),
+        "summary": dict(report.summary(), quarantined=sum(row["rows"] for row in quarantined)),
+        "cities": freshness.to_dict(orient="records"),
+        "report": report.freshness_messages(),
+        "quarantine": quarantined,
+    })
+
+
+def _stored_quality(out_dir, config_path):
+    """the QualityReport of the previous build, None when there is none or the config changed"""
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            manifest = json.load(f)
+        with open(os.path.join(out_dir, FILES["freshness"])) as f:
+            stored = json.load(f)
+        missing = pd.read_csv(os.path.join(out_dir, FILES["missing"]), parse_dates=["date"])
+        outliers = pd.read_csv(os.path.join(out_dir, FILES["outliers"]), parse_dates=["date"])
+    except (FileNotFoundError, json.JSONDecodeError, pd.errors.EmptyDataError):
+        return None
+    if manifest.get("version") != VERSION or manifest.get("config") != file_signature(config_path):
+        return None
+    freshness = pd.DataFrame(stored["cities"])
+    return QualityReport(
+        rows=stored["summary"]["rows"],
+        missing=missing,
+        outliers=outliers,
+        freshness=freshness.assign(last_date=pd.to_datetime(freshness["last_date"])),
+        checked_on=datetime.date.fromisoformat(stored["generated"]),
+    )
+
+
+def build_artifacts(processed_path=PROCESSED_PATH, config_path=CONFIG_PATH, out_dir=DEFAULT_DIR, new_rows=None):
+    """
+    reads the processed file once and writes every artifact, the manifest last.
+    new_rows -> the processed rows upserted by this pipeline run; only they are quality
+                checked and merged into the previous report (everything is checked otherwise)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    edges = get_temp_edges(config_path)
+    coordinates = _city_coordinates(config_path)
+    df = read_processed(processed_path)
+    merged = _merge_df(df, coordinates)
+
+    # quality reports, on the rows the dashboard shows
+    settings = get_quality_settings(config_path)
+    previous = _stored_quality(out_dir, config_path) if new_rows is not None else None
+    if previous is not None:
+        checked = merged[key_index(merged).isin(key_index(new_rows))]
+        report = run_quality_checks(checked, settings, previous=previous)
+    else:
+        report = run_quality_checks(merged, settings)
+    quarantine_root = get_validation_settings(config_path)["quarantine_root"]
+    _write_quality(out_dir, report, quarantine_summary(quarantine_root))
+
+    # daily series with the % change columns (already in files written by the pipeline)
+    daily = _get_pct_change(merged)
+    _write_csv(out_dir, FILES["daily"], daily)
+    # latest day per city for the map, colors included
+    snapshot = latest_snapshot(daily)
+    snapshot = snapshot.assign(date=snapshot["date"].dt.strftime("%Y-%m-%d"))
+    _write(out_dir, FILES["snapshot"], lambda tmp: snapshot.to_json(tmp, orient="records", indent=1))
+
+    _write_csv(out_dir, FILES["regression"], sufficient_stats(df, x="TAVG", y="Demand"))
+    _write_csv(out_dir, FILES["heatmap"], build_heatmap_cube(df, edges))
+
+    _write_json(out_dir, MANIFEST, {
+        "version": VERSION,
+        "built_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "source": file_signature(processed_path),
+        "config": file_signature(config_path),
+        "quarantine": quarantine_signatures(config_path),
+        "edges": list(edges),
+        "rows": len(daily),
+        "files": FILES,
+    })
+    return load_artifacts(out_dir)
+
+
+def is_current(processed_path=PROCESSED_PATH, config_path=CONFIG_PATH, out_dir=DEFAULT_DIR):
+    """True when the artifacts were built from the current processed file, config and quarantine files"""
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return False
+    return (
+        manifest.get("version") == VERSION
+        and manifest.get("source") == file_signature(processed_path)
+        and manifest.get("config") == file_signature(config_path)
+        and manifest.get("quarantine") == quarantine_signatures(config_path)
+        and np.array_equal(manifest.get("edges", []), get_temp_edges(config_path))
+        and all(os.path.exists(os.path.join(out_dir, name)) for name in FILES.values())
+    )
+
+
+def load_artifacts(out_dir=DEFAULT_DIR):
+    """{name: DataFrame}, plus "freshness" as the stored dict"""
+    artifacts = {}
+    for name, file in FILES.items():
+        path = os.path.join(out_dir, file)
+        if file.endswith(".json"):
+            with open(path) as f:
+                data = json.load(f)
+            # record lists (the map snapshot) are tables
+            artifacts[name] = pd.DataFrame(data) if isinstance(data, list) else data
+        elif os.path.getsize(path) <= 1:
+            artifacts[name] = pd.DataFrame()   # empty report
+        elif name == "daily":
+            artifacts[name] = read_processed(path)
+        else:
+            artifacts[name] = pd.read_csv(path, parse_dates=DATE_COLUMNS.get(name, []))
+    return artifacts
+
+
+def ensure_artifacts(processed_path=PROCESSED_PATH, config_path=CONFIG_PATH, out_dir=DEFAULT_DIR):
+    """stored artifacts, rebuilt first when they are missing or out of date"""
+    if is_current(processed_path, config_path, out_dir):
+        return load_artifacts(out_dir)
+    return build_artifacts(processed_path, config_path, out_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute the dashboard artifacts from the processed data")
+    parser.add_argument("--data", default=PROCESSED_PATH)
+    parser.add_argument("--config", default=CONFIG_PATH)
+    parser.add_argument("--out", default=DEFAULT_DIR)
+    parser.add_argument("--check", action="store_true", help="only report whether the artifacts are current")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        current = is_current(args.data, args.config, args.out)
+        print("Artifacts are up to date." if current else "Artifacts are missing or out of date.")
+        return 0 if current else 1
+
+    artifacts = build_artifacts(args.data, args.config, args.out)
+    print(f"Wrote {len(FILES)} artifacts ({len(artifacts['daily'])} daily rows) to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import hashlib
+import datetime
+import tempfile
+
+# credentials never take part in the cache key
+SECRET_PARAMS = {"api_key", "token"}
+# expired recent entries with an ETag / Last-Modified are kept this long (seconds) for revalidation
+REVALIDATE_SECONDS = 24 * 3600
+
+
+def _normalize(params):
+    normalized = {}
+    for key, value in (params or {}).items():
+        if key in SECRET_PARAMS:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            value = sorted(str(v) for v in value)
+        else:
+            value = str(value)
+        normalized[key] = value
+    return normalized
+
+
+def _end_date(params):
+    """last day a request covers (NOAA `enddate`, EIA `end`), or None"""
+    value = (params or {}).get("enddate") or (params or {}).get("end")
+    try:
+        return datetime.date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _month_start(day):
+    return day.replace(day=1)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ResponseCache:
+    """
+    Content-addressed cache of JSON responses, one file per endpoint + normalized params.
+    - responses that end before the last `recent_days` days are final and kept forever
+    - recent responses go under <root>/recent, expire after `recent_ttl` seconds and are
+      refreshed with If-None-Match / If-Modified-Since when the server gave us validators
+      (for up to REVALIDATE_SECONDS), after that they are pruned
+    - with `offline=True` only cached responses are served, nothing goes to the network
+    - `split_range` cuts a request so its final days get a key that repeats from run to run
+    """
+
+    def __init__(self, root="./data/cache", recent_days=3, recent_ttl=6 * 3600, offline=False):
+        self.root = root
+        self.recent_days = recent_days
+        self.recent_ttl = recent_ttl
+        self.offline = offline
+        self._pruned = False
+
+    def key(self, url, params):
+        payload = json.dumps({"url": url, "params": _normalize(params)}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key, final=True):
+        root = self.root if final else os.path.join(self.root, "recent")
+        return os.path.join(root, key[:2], f"{key}.json")
+
+    def _cutoff(self):
+        """first day that is still recent, requests ending before it are final"""
+        return datetime.date.today() - datetime.timedelta(days=self.recent_days)
+
+    def split_range(self, start, end):
+        """
+        splits the inclusive ISO date range start..end into the part that is final, ending
+        on the last month boundary before the recent days, and the rest. The pipeline always
+        asks up to today, so without the split its keys change daily and are never served
+        again; the final part keeps its key for as long as `start` does (a day that keeps
+        coming back empty) and is read from the cache until the next month boundary.
+        """
+        first = datetime.date.fromisoformat(str(start)[:10])
+        last = datetime.date.fromisoformat(str(end)[:10])
+        boundary = _month_start(self._cutoff())
+        if not first < boundary <= last:
+            return [(str(start), str(end))]
+        return [(str(first), str(boundary - datetime.timedelta(days=1))), (str(boundary), str(last))]
+
+    def get(self, url, params):
+        """returns the cached entry or None, recent entries past revalidation are removed"""
+        key = self.key(url, params)
+        for final in (True, False):
+            path = self._path(key, final)
+            try:
+                with open(path) as f:
+                    entry = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                continue
+            if not (self.offline or self._usable(entry)):
+                _remove(path)
+                return None
+            return entry
+        return None
+
+    def is_fresh(self, entry):
+        if entry.get("final"):
+            return True
+        return time.time() - entry.get("stored_at", 0) < self.recent_ttl
+
+    def _usable(self, entry):
+        """fresh, or expired but still worth a conditional request"""
+        if self.is_fresh(entry):
+            return True
+        age = time.time() - entry.get("stored_at", 0)
+        return bool(self.conditional_headers(entry)) and age < REVALIDATE_SECONDS
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url, params, body, response_headers=None):
+        end = _end_date(params)
+        final = end is not None and end < self._cutoff()
+        response_headers = response_headers or {}
+        entry = {
+            "url": url,
+            "params": _normalize(params),
+            "stored_at": time.time(),
+            "final": final,
+            "etag": response_headers.get("ETag"),
+            "last_modified": response_headers.get("Last-Modified"),
+            "body": body,
+        }
+        if not final and not self._pruned:
+            self.prune()
+        path = self._path(self.key(url, params), final)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temp file first so concurrent readers never see half an entry
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+        return entry
+
+    def prune(self):
+        """removes the recent entries that are past revalidation, returns how many; runs on the first recent put"""
+        self._pruned = True
+        removed = 0
+        for folder, _, files in os.walk(os.path.join(self.root, "recent")):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue   # a put in progress
+                path = os.path.join(folder, name)
+                try:
+                    with open(path) as f:
+                        entry = json.load(f)
+                except FileNotFoundError:
+                    continue
+                except json.JSONDecodeError:
+                    entry = {}
+                if not self._usable(entry):
+                    _remove(path)
+                    removed += 1
+        return removed
+
+    def touch(self, url, params, entry):
+        """server confirmed (304) the cached body is still current"""
+        return self.put(url, params, entry["body"], {"ETag": entry.get("etag"), "Last-Modified": entry.get("last_modified")})
@@ -0,0 +1,345 @@
+"""
+Streamlit / Plotly / pydeck rendering of the dashboard views. The numbers come
+from src/analysis.py; only the dashboard imports this module.
+"""
+import pandas as pd
+import streamlit as st
+import pydeck as pdk
+import plotly.graph_objects as go
+import plotly.express as px
+import numpy as np
+
+from src.heatmap import DEFAULT_TEMP_EDGES
+from src.transform import as_processed_schema
+from src.analysis import (
+    _merge_df,
+    filter_frame,
+    latest_snapshot,
+    time_series_frame,
+    correlation_view,
+    heatmap_matrix,
+    DEFAULT_WINDOW_DAYS,
+)
+
+# Function to load data and apply filters
+def load_and_filter_data(df, cities=None, filter_data=None):
+    """
+    df -> processed data, merged with `cities` coordinates unless that was already done
+    filter_data -> optional (start_date, end_date, cities) -> frame, e.g. a cached filter
+    """
+    # Merge with city data
+    if cities is not None:
+        df = _merge_df(df, cities)
+    # typed once here (no-op for read_processed / artifact frames), the views use the dates as they are
+    df = as_processed_schema(df)
+
+    # Sidebar filters
+    st.sidebar.header("Filters")
+
+    # Date range selector
+    min_date = df["date"].min().date()
+    max_date = df["date"].max().date()
+    start_date, end_date = st.sidebar.date_input(
+        "Select Date Range",
+        value=[min_date, max_date],
+        min_value=min_date,
+        max_value=max_date
+    )
+
+    # City filter (multiselect)
+    city_options = sorted(df["city"].unique())
+    selected_cities = st.sidebar.multiselect(
+        "Select Cities",
+        options=city_options,
+        default=city_options
+    )
+
+    # Filter dataframe
+    if filter_data is not None:
+        df_filtered = filter_data(start_date, end_date, selected_cities)
+    else:
+        df_filtered = filter_frame(df, start_date, end_date, selected_cities)
+
+    return df_filtered, df
+
+
+
+
+
+# Visualization 1 -
+# Function to create a geographic overview of cities
+def geographic_overview(filtered_df, df, snapshot=None):
+    """
+    snapshot -> optional precomputed latest_snapshot of the whole dataset; used when the
+                selection ends on the last date, otherwise the snapshot of the selection
+    """
+    # get last date in data
+    last_date = df["date"].max()
+
+    # latest day per city with % change in demand and the demand colors
+    cities = filtered_df["city"].unique()
+    if snapshot is not None and len(filtered_df) and filtered_df["date"].max() == last_date:
+        data = snapshot[snapshot["city"].isin(cities)]
+    else:
+        data = latest_snapshot(filtered_df)
+
+
+
+    st.write(f"Last updated: {last_date.date()}")
+
+    # Define layer
+    layer = pdk.Layer(
+        "ScatterplotLayer",
+        data=data,
+        get_position="[Longitude, Latitude]",
+        get_color="color",
+        get_radius=120000,
+        pickable=True
+    )
+
+    # Set the initial view
+    view_state = pdk.ViewState(
+        latitude=data["Latitude"].mean(),
+        longitude=data["Longitude"].mean(),
+        zoom=3,
+        pitch=50
+    )
+
+    tooltip = {
+    "html": "<b>{city}, {state}</b><br/>"
+            "Temperature: {TMIN}°F - {TMAX}°F<br/>"
+            "Energy Usage: {Demand} {value-units}<br/>"
+            "% Change from yesterday: {Demand_pct_change}%",
+    "style": {"backgroundColor": "steelblue", "color": "white"}
+    }
+
+
+
+    # Create and show chart
+    r = pdk.Deck(layers=[layer], initial_view_state=view_state, tooltip=tooltip)
+
+    return r
+
+
+
+# weekday -> (fillcolor, opacity) of the weekend bands
+WEEKEND_STYLE = {5: ("LightGray", 0.25), 6: ("LightBlue", 0.18)}
+
+
+def _weekend_shapes(start, end):
+    """
+    Saturday and Sunday bands between start and end as two SVG path shapes, each path
+    holding one rectangle per day. Built with array ops, so the figure keeps two shapes
+    however long the range is.
+    """
+    days = pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), freq="D")
+    weekday = np.asarray(days.weekday)
+    # date axes take path coordinates as date strings
+    left_all = np.asarray(days.strftime("%Y-%m-%d"), dtype=str)
+    right_all = np.asarray((days + pd.Timedelta(days=1)).strftime("%Y-%m-%d"), dtype=str)
+
+    shapes = []
+    for day, (fillcolor, opacity) in WEEKEND_STYLE.items():
+        selected = weekday == day
+        if not selected.any():
+            continue
+        left, right = left_all[selected], right_all[selected]
+        # M left,0 H right V 1 H left Z  -> one full-height rectangle per day
+        rects = np.char.add(np.char.add(np.char.add("M", left), ",0H"), right)
+        rects = np.char.add(np.char.add(rects, "V1H"), np.char.add(left, "Z"))
+        shapes.append(dict(
+            type="path",
+            path="".join(rects),
+            xref="x",
+            yref="paper",  # "paper" means relative to chart height
+            fillcolor=fillcolor,
+            opacity=opacity,
+            layer="below",
+            line_width=0
+        ))
+    return shapes
+
+
+# visualization 2 - Function to create a time series analysis of energy usage and weather
+def time_series_analysis(data, window_days=DEFAULT_WINDOW_DAYS):
+    """
+    data -> filtered rows in the processed schema; the series comes from time_series_frame
+            (one city, or the daily mean over all cities)
+    window_days -> days shown up to the last date (None = everything), see
+                   analysis.time_series_window_days in config.yaml
+    Returns a Plotly figure with:
+      - TAVG (avg temp) on left axis
+      - Demand on right axis
+      - Weekend shading: Saturday = LightGray, Sunday = LightBlue
+    """
+    # dropdown for city selection
+    cities = ["All Cities"] + sorted(data["city"].unique())
+    selected_city = st.selectbox("Select a city", cities)
+
+    df_recent = time_series_frame(data, selected_city, window_days)
+
+
+    if df_recent.empty:
+        st.warning("No data available for the selected city / date range.")
+        return go.Figure()
+    
+    
+    # create a plotly figure
+    fig = go.Figure()
+    
+    # add temperature trace (left side)
+    fig.add_trace(go.Scatter(
+        x=df_recent["date"],
+        y=df_recent["TAVG"],
+        name="Average Daily Temperature (°F)",
+        # mode="lines+markers",
+        mode="lines",
+        line=dict(color='firebrick', width=2),
+        yaxis="y1"
+    ))
+    
+    # add Energy demand trace (right axis)
+    fig.add_trace(go.Scatter(
+        x=df_recent["date"],
+        y=df_recent["Demand"],
+        name="Energy Demand",
+        # mode="lines+markers",
+        mode="lines",
+        line=dict(color='royalblue', width=2, dash="dot"), 
+        yaxis="y2"
+    ))
+    
+    # 🔹 Weekend shading: one path shape per day type instead of one rectangle per day
+    for shape in _weekend_shapes(df_recent["date"].min(), df_recent["date"].max()):
+        fig.add_shape(shape)
+
+    fig.update_layout(
+        title=f"Temperature vs Energy Demand - {selected_city}",
+        xaxis=dict(title="Date"),
+        yaxis=dict(title="Temperature (°F)", side="left"),
+        yaxis2=dict(title="Energy Demand (MWh)", side="right", overlaying="y"),
+        legend=dict(x=0.01, y=0.99, bgcolor="rgba(255,255,255,0)"),
+        template="plotly_white",
+        hovermode="x unified"
+    )
+    
+    return fig
+
+
+# above this many points the scatter is drawn with WebGL instead of SVG
+WEBGL_THRESHOLD = 5000
+
+
+def correlation_analysis(data, max_points=None, stats=None):
+    """
+    max_points -> optionally plot a per-city sample of the points (the fit always uses all rows)
+    stats -> optional precomputed sufficient_stats per (city, date); the fit then only sums
+             the rows of the selected cities and dates instead of refitting the data
+    """
+    # Dropdown: city selection
+    city_options = ["All Cities"] + sorted(data["city"].unique())
+    selected_city = st.selectbox("Select a city for correlation analysis", city_options)
+    
+    # X = Temperature, Y = Energy Demand
+    view = correlation_view(data, selected_city, stats, max_points)
+    model = view["fit"]
+    
+    slope = model["slope"]
+    intercept = model["intercept"]
+    r_squared = model["r_squared"]
+    corr_coef = model["r"]
+    
+    # Regression line values
+    x_vals = np.linspace(*view["x_range"], 100)
+    y_pred = intercept + slope * x_vals
+    
+    # Scatter plot with city colors, tooltips are filled in by the browser from customdata
+    points = view["points"]
+    scatter = go.Scattergl if len(points) > WEBGL_THRESHOLD else go.Scatter
+    fig = go.Figure()
+    fig.add_trace(scatter(
+        x=points["TAVG"],
+        y=points["Demand"],
+        mode="markers",
+        marker=dict(
+            size=7,
+            color=points["city"].astype('category').cat.codes,
+            colorscale="Viridis",
+            showscale=True
+        ),
+        customdata=np.column_stack([
+            points["city"].astype(str),
+            points["state"].astype(str),
+            points["date"].dt.strftime("%Y-%m-%d"),
+        ]),
+        hovertemplate=(
+            "%{customdata[0]}, %{customdata[1]}<br>Date: %{customdata[2]}<br>"
+            "TAVG: %{x}°F<br>Demand: %{y} MWh<extra></extra>"
+        ),
+        name="Data Points"
+    ))
+    
+    # Add regression line
+    fig.add_trace(go.Scatter(
+        x=x_vals,
+        y=y_pred,
+        mode="lines",
+        line=dict(color="red", width=2),
+        name=f"Regression Line: y = {intercept:.2f} + {slope:.2f}x"
+    ))
+    
+    # Layout
+    fig.update_layout(
+        title=f"Temperature vs Energy Demand - {selected_city}",
+        xaxis_title="Average Temperature (°F)",
+        yaxis_title="Energy Demand (MWh)",
+        template="plotly_white",
+        legend=dict(x=0.01, y=0.99)
+    )
+    
+    # Show stats
+    st.write(f"**Slope:** {slope:.2f}  |  **Intercept:** {intercept:.2f}")
+    st.write(f"**R²:** {r_squared:.3f}  |  **Correlation (r):** {corr_coef:.3f}")
+    if view["per_city"] is not None:
+        # one fit per city from the same sums
+        st.dataframe(view["per_city"].round(3), hide_index=True)
+    
+    return fig
+
+
+
+def usage_patterns_heatmap(data, cube=None, edges=DEFAULT_TEMP_EDGES):
+    """
+    data -> filtered rows
+    cube -> optional precomputed build_heatmap_cube of the whole dataset; only valid when
+            `data` covers the full date range, the heatmap is then a sum over a few rows
+    edges -> inner temperature bin edges (°F)
+    """
+    # Dropdown for city
+    city_options = ["All Cities"] + sorted(data["city"].unique())
+    selected_city = st.selectbox("Select a city for heatmap", city_options)
+
+    cities = [selected_city] if selected_city != "All Cities" else data["city"].unique()
+
+    # --- rows hot->cold, columns Mon->Sun ---
+    heatmap_pivot = heatmap_matrix(data, cities, cube, edges)
+
+    # --- plot: NO axis reversal; first row (>90°F) will be at the top ---
+    fig = px.imshow(
+        heatmap_pivot,
+        color_continuous_scale="YlOrRd",        # low=light, high=red
+        aspect="auto",
+        labels=dict(color="Avg Energy Demand (MWh)"),
+        text_auto=".1f",
+        origin="upper"                          # keeps first index row at the top
+    )
+
+    fig.update_layout(
+        title="Usage Patterns by Temperature & Day of Week",
+        xaxis_title="Day of Week",
+        yaxis_title="Temperature Range (hot → cold)",
+        coloraxis_colorbar=dict(title="Avg Energy Demand (MWh)"),
+        margin=dict(l=80, r=40, t=70, b=40),
+    )
+
+    return fig
@@ -0,0 +1,47 @@
+import streamlit as st
+
+from src.analysis import filter_frame
+from src.artifacts import DEFAULT_DIR, ensure_artifacts, file_signature, quarantine_signatures
+
+
+# cache_resource hands every session the same objects instead of a copy per call;
+# safe because nothing in src/analysis.py or src/charts.py modifies the frames it is given
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _load_artifacts(data_path, data_signature, config_path, config_signature, quarantine_signature, artifact_dir):
+    # normally built by the cron job, only rebuilt here when it has not run since the data changed
+    return ensure_artifacts(data_path, config_path, artifact_dir)
+
+
+def load_dashboard_artifacts(data_path, config_path, artifact_dir=DEFAULT_DIR):
+    """precomputed artifacts (see src/artifacts.py), read once per file version"""
+    return _load_artifacts(
+        data_path, file_signature(data_path), config_path, file_signature(config_path),
+        quarantine_signatures(config_path), artifact_dir
+    )
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _filter(data_path, data_signature, config_path, config_signature, quarantine_signature, artifact_dir,
+            start_date, end_date, cities):
+    df = _load_artifacts(
+        data_path, data_signature, config_path, config_signature, quarantine_signature, artifact_dir
+    )["daily"]
+    return filter_frame(df, start_date, end_date, cities)
+
+
+def cached_filter(data_path, config_path, artifact_dir=DEFAULT_DIR):
+    """
+    returns filter(start_date, end_date, cities) for load_and_filter_data,
+    the result of every selection is cached until the files change
+    """
+    data_signature = file_signature(data_path)
+    config_signature = file_signature(config_path)
+    quarantine_signature = quarantine_signatures(config_path)
+
+    def filter_data(start_date, end_date, cities):
+        return _filter(
+            data_path, data_signature, config_path, config_signature, quarantine_signature, artifact_dir,
+            start_date, end_date, tuple(sorted(cities))
+        )
+
+    return filter_data
@@ -1,12 +1,48 @@
-import os, requests
-import yaml, json, time
+import os
+import yaml
 import pandas as pd
 import datetime
-from dotenv import find_dotenv, load_dotenv
-load_dotenv()
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
 
-NAOO_TOKEN = os.environ["NAOO_TOKEN"]
-EIA = os.getenv("EIA_KEY")
+from src.http_client import get_client
+from src.metrics import carry
+
+
+# API roots, overridable in config.yaml (fetch.endpoints) or with NOAA_BASE_URL / EIA_BASE_URL,
+# e.g. to point the pipeline at the local stand-in server (python -m benchmarks.standin)
+DEFAULT_ENDPOINTS = {
+    "noaa": "https://www.ncei.noaa.gov/cdo-web/api/v2",
+    "eia": "https://api.eia.gov/v2",
+}
+_endpoints = dict(DEFAULT_ENDPOINTS)
+
+
+def configure_endpoints(**endpoints):
+    """sets the API roots used from now on, e.g. configure_endpoints(noaa="http://localhost:8765/cdo-web/api/v2")"""
+    _endpoints.update({api: url for api, url in endpoints.items() if url})
+
+
+def _base_url(api):
+    """environment first, then the configured root, without a trailing slash"""
+    return (os.getenv(f"{api.upper()}_BASE_URL") or _endpoints[api]).rstrip("/")
+
+
+@functools.lru_cache(maxsize=None)
+def _load_env():
+    load_dotenv()
+
+
+def _credential(name, required=False):
+    """
+    API key from the environment (or .env), read when a request is made rather than
+    at import, so importing this module needs no credentials
+    """
+    _load_env()
+    if required:
+        return os.environ[name]
+    return os.getenv(name)
 
 
 
@@ -16,90 +52,219 @@ def get_cities(config_path):
     city_list = data["cities"]
     return city_list
 
-def get_weather_dates_per_city(file_path):
-    df = pd.read_csv(file_path, parse_dates=["date"])
-    # 2. Get last date per city
-    weather_last_dates = df.groupby("city")["date"].max().to_dict()
-    return weather_last_dates
-        # return df["date"].max().date() + datetime.timedelta(days=1)
-
-
-def get_energy_dates_per_city(file_path):    
-    df = pd.read_csv(file_path, parse_dates=["period"])
-    # 2. Get last date per city
-    energy_last_dates = df.groupby(["city", "type"])["period"].max().to_dict()
-    return energy_last_dates
-    # return df["period"].max().date() + datetime.timedelta(days=1)
-
+def get_fetch_settings(config_path):
+    """returns worker count, per-API rate limits, http client, response cache and API root settings"""
+    with open(config_path) as f:
+        data = yaml.safe_load(f)
+    fetch = data.get("fetch") or {}
+    rate_limits = {"noaa": {"rate": 4, "burst": 4}, "eia": {"rate": 4, "burst": 4}}
+    rate_limits.update(fetch.get("rate_limits") or {})
+    return {
+        "max_workers": fetch.get("max_workers", 4),
+        "energy_batch": fetch.get("energy_batch", True),
+        "rate_limits": rate_limits,
+        "http": fetch.get("http") or {},
+        "cache": data.get("cache") or {},
+        "endpoints": fetch.get("endpoints") or {},
+    }
 
 def get_weather_start_date(city, date_dict):
-    default_start = datetime.date.today() - datetime.timedelta(days=120)
+    default_start = pd.Timestamp(datetime.date.today() - datetime.timedelta(days=120))
     start_date = date_dict.get(city, default_start) + datetime.timedelta(days=1)
     return str(start_date.date())
     
     
 def get_energy_start_date(city, type, date_dict):
     key = (city, type)
-    default_start = datetime.date.today() - datetime.timedelta(days=120)
+    default_start = pd.Timestamp(datetime.date.today() - datetime.timedelta(days=120))
     start_date = date_dict.get(key, default_start) + datetime.timedelta(days=1)
     return str(start_date.date())
 
 
 def fetch_with_retry(url, headers, retries=3, delay=5):
-    for attempt in range(retries):
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            return response
-        print(f"Attempt {attempt+1} failed. Retrying in {delay} seconds...")
-        time.sleep(delay)
-    response.raise_for_status()
+    # backoff between attempts is handled by the shared client, `delay` is kept for old callers
+    return get_client().get(url, headers=headers, max_retries=retries - 1)
 
 
-def fetch_weather_data(station, start, end):
-    url = "https://www.ncei.noaa.gov/cdo-web/api/v2/data"
-    hdr = {"token": NAOO_TOKEN}
+# NOAA caps GHCND requests at a one year date range and 1000 results per page
+NOAA_MAX_WINDOW_DAYS = 365
+NOAA_PAGE_LIMIT = 1000
+
+
+def _date_windows(start, end, max_days=NOAA_MAX_WINDOW_DAYS):
+    """splits the inclusive range start..end into consecutive (start, end) windows of at most max_days"""
+    start = datetime.date.fromisoformat(str(start)[:10])
+    end = datetime.date.fromisoformat(str(end)[:10])
+    windows = []
+    while start <= end:
+        window_end = min(start + datetime.timedelta(days=max_days - 1), end)
+        windows.append((str(start), str(window_end)))
+        start = window_end + datetime.timedelta(days=1)
+    return windows
+
+
+def _cacheable_ranges(start, end):
+    """
+    start..end as one or more (start, end) requests; with a response cache the final days
+    are asked for separately so they are served from the cache on the next runs
+    """
+    cache = getattr(get_client(), "cache", None)
+    if cache is None:
+        return [(str(start), str(end))]
+    return cache.split_range(start, end)
+
+
+def _fetch_weather_page(station, start, end, offset=1):
+    url = f"{_base_url('noaa')}/data"
+    hdr = {"token": _credential("NAOO_TOKEN", required=True)}
     prm = {
         "datasetid": "GHCND",
         "stationid": station,
         "startdate": start,
         "enddate": end,
         "datatypeid": ["TMAX, TMIN"],
-        "limit": 1000,
+        "limit": NOAA_PAGE_LIMIT,
+        "offset": offset,
         "units": "standard"
     }
-    
-    for i in range(3):
-        try:
-            
-            response = requests.get(f"{url}", headers=hdr, params=prm, timeout=300)
-            response.raise_for_status()
-            break # if successful, exit loop
-        except requests.exceptions.HTTPError as e:
-            print(f"Attempt {i+1} falied: {e}")
-            time.sleep(5)
-    return response.json()
+    return get_client().get_json(url, params=prm, headers=hdr, api="noaa")
 
-def fetch_energy_data(region, types, timezone, start, end):
-    
-    url = "https://api.eia.gov/v2/electricity/rto/daily-region-data/data/"
-    params = {
-        "api_key": EIA,
-        "facets[respondent][]": region,
-        "facets[type][]": types, 
-        # "facets[type][]": "NG",
-        "facets[timezone][]": timezone,
+
+def _fetch_weather_window(station, start, end, max_workers=4):
+    """all results for one window: reads the first page, then the remaining pages in parallel"""
+    first = _fetch_weather_page(station, start, end)
+    results = list(first.get("results") or [])
+    count = first.get("metadata", {}).get("resultset", {}).get("count", len(results))
+
+    offsets = list(range(NOAA_PAGE_LIMIT + 1, count + 1, NOAA_PAGE_LIMIT))
+    if offsets:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(offsets))) as pool:
+            pages = pool.map(carry(lambda offset: _fetch_weather_page(station, start, end, offset)), offsets)
+            for page in pages:
+                results.extend(page.get("results") or [])
+    return results
+
+
+def iter_weather_results(station, start, end, max_workers=4):
+    """
+    yields the results of each date window in date order, as soon as it is complete.
+    Windows are fetched in parallel, so long backfills are not truncated or serialised.
+    """
+    windows = [window for part in _cacheable_ranges(start, end) for window in _date_windows(*part)]
+    if len(windows) == 1:
+        yield _fetch_weather_window(station, *windows[0], max_workers=max_workers)
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(windows))) as pool:
+        yield from pool.map(carry(lambda w: _fetch_weather_window(station, *w, max_workers=max_workers)), windows)
+
+
+def fetch_weather_data(station, start, end):
+    results = []
+    for window_results in iter_weather_results(station, start, end):
+        results.extend(window_results)
+    return {"metadata": {"resultset": {"count": len(results)}}, "results": results}
+
+# EIA v2 returns at most 5000 rows per request, the rest is reached with offset/length
+EIA_PAGE_LENGTH = 5000
+
+
+def _fetch_energy_page(params, offset):
+    url = f"{_base_url('eia')}/electricity/rto/daily-region-data/data/"
+    page_params = dict(params, offset=offset, length=EIA_PAGE_LENGTH)
+    page_params["api_key"] = _credential("EIA_KEY")
+    return get_client().get_json(url, params=page_params, api="eia")
+
+
+def _fetch_energy_pages(params, max_workers=4):
+    """reads the first page, then pages through response.total in parallel"""
+    first = _fetch_energy_page(params, 0)
+    if not isinstance(first.get("response"), dict):
+        # EIA reports bad parameters or keys as {"error": ...} with a 200 status
+        raise ValueError(f"unexpected EIA payload: {first.get('error') or sorted(first)}")
+    response = first["response"]
+    rows = list(response.get("data") or [])
+    total = int(response.get("total") or len(rows))
+
+    offsets = list(range(EIA_PAGE_LENGTH, total, EIA_PAGE_LENGTH))
+    if offsets:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(offsets))) as pool:
+            for page in pool.map(carry(lambda offset: _fetch_energy_page(params, offset)), offsets):
+                rows.extend((page.get("response") or {}).get("data") or [])
+    return {"response": {"total": total, "data": rows}}
+
+
+def _energy_params(regions, types, timezones, start, end):
+    # a fixed sort order keeps the rows stable while paging
+    return {
+        "facets[respondent][]": list(regions),
+        "facets[type][]": list(types),
+        "facets[timezone][]": list(timezones),
         "start": start,
         "end": end,
         "data[]": "value",
-        
+        "sort[0][column]": "period",
+        "sort[0][direction]": "desc",
+        "sort[1][column]": "respondent",
+        "sort[1][direction]": "asc",
+        "sort[2][column]": "type",
+        "sort[2][direction]": "asc",
+        "sort[3][column]": "timezone",
+        "sort[3][direction]": "asc",
     }
-    for i in range(3):
-        try:
-            
-            response = requests.get(url, params=params, timeout=300)
-            response.raise_for_status()
-            break # if successful, exit loop
-        except requests.exceptions.HTTPError as e:
-            print(f"Attempt {i+1} falied: {e}")
-            time.sleep(5)
-    return response.json()
\ No newline at end of file
+
+
+def _fetch_energy_range(regions, types, timezones, start, end):
+    """rows of start..end, newest first like a single request, final days cached separately"""
+    rows = []
+    for part in reversed(_cacheable_ranges(start, end)):
+        params = _energy_params(regions, types, timezones, *part)
+        rows.extend(_fetch_energy_pages(params)["response"]["data"])
+    return {"response": {"total": len(rows), "data": rows}}
+
+
+def fetch_energy_data(region, types, timezone, start, end):
+    return _fetch_energy_range([region], [types], [timezone], start, end)
+
+
+def fetch_energy_batch(regions, types, timezones, start, end, batch_size=25):
+    """
+    one paged request for many respondents and types at once instead of one per (city, type).
+    `regions` and `timezones` are parallel lists (one entry per city). EIA returns every
+    respondent x timezone combination of a request, so respondents are grouped by their
+    own timezone and each group is sent with only that timezone, in chunks of `batch_size`
+    to keep URLs short.
+    Returns the combined rows as {"response": {"total": ..., "data": [...]}}
+    """
+    by_timezone = {}
+    for region, timezone in sorted(set(zip(regions, timezones))):
+        by_timezone.setdefault(timezone, []).append(region)
+    rows = []
+    for timezone, group in by_timezone.items():
+        for i in range(0, len(group), batch_size):
+            result = _fetch_energy_range(group[i:i + batch_size], sorted(set(types)), [timezone], start, end)
+            rows.extend(result["response"]["data"])
+    return {"response": {"total": len(rows), "data": rows}}
+
+
+def energy_rows(result):
+    """the data rows of an EIA result, [] when the payload has none"""
+    response = (result or {}).get("response")
+    if not isinstance(response, dict):
+        return []
+    return response.get("data") or []
+
+
+def split_energy_by_city(rows, cities):
+    """
+    demultiplexes batched EIA rows back to the config cities.
+    Returns {(city, type): [rows]} matched on respondent and timezone.
+    """
+    lookup = {}
+    for city_info in cities:
+        lookup.setdefault((city_info["region"], city_info["timezone"]), []).append(city_info["city"])
+
+    per_city = {}
+    for row in rows:
+        for city in lookup.get((row.get("respondent"), row.get("timezone")), []):
+            per_city.setdefault((city, row.get("type")), []).append(row)
+    return per_city
@@ -0,0 +1,63 @@
+import yaml
+import pandas as pd
+
+from src.transform import as_dates
+
+# inner edges of the temperature bins (°F), the outer bins are open ended
+DEFAULT_TEMP_EDGES = [50, 60, 70, 80, 90]
+DAY_ORDER = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+CUBE_COLUMNS = ["city", "TempRange", "DayOfWeek", "sum", "count"]
+
+
+def temp_labels(edges):
+    """bin labels cold -> hot, e.g. ["<50°F", "50-60°F", ..., ">90°F"]"""
+    edges = list(edges)
+    labels = [f"<{edges[0]}°F"]
+    labels += [f"{low}-{high}°F" for low, high in zip(edges[:-1], edges[1:])]
+    labels.append(f">{edges[-1]}°F")
+    return labels
+
+
+def build_heatmap_cube(df, edges=DEFAULT_TEMP_EDGES):
+    """
+    (city, TempRange, DayOfWeek) -> (sum, count) of Demand.
+    A few hundred rows whatever the history length; the mean demand of any city
+    selection is sum / count after adding up the selected cities.
+    """
+    bins = [-float("inf")] + list(edges) + [float("inf")]
+    temp_range = pd.cut(df["TAVG"], bins=bins, labels=temp_labels(edges))
+    day = as_dates(df["date"]).dt.day_name()
+    demand = df["Demand"].astype(float)   # float32 in the typed frame, the sums need float64
+    valid = temp_range.notna() & demand.notna()
+
+    cube = (
+        pd.DataFrame({
+            "city": df["city"].astype(str)[valid],
+            "TempRange": temp_range[valid].astype(str),
+            "DayOfWeek": day[valid],
+            "Demand": demand[valid],
+        })
+        .groupby(["city", "TempRange", "DayOfWeek"], sort=True)["Demand"]
+        .agg(["sum", "count"])
+        .reset_index()
+    )
+    return cube[CUBE_COLUMNS]
+
+
+def heatmap_from_cube(cube, edges=DEFAULT_TEMP_EDGES, cities=None):
+    """
+    mean demand per temperature bin (rows hot -> cold) and weekday (columns Mon -> Sun)
+    for the given cities (None = all cities in the cube)
+    """
+    if cities is not None:
+        cube = cube[cube["city"].isin(list(cities))]
+    totals = cube.groupby(["TempRange", "DayOfWeek"])[["sum", "count"]].sum()
+    mean = (totals["sum"] / totals["count"]).unstack("DayOfWeek")
+    return mean.reindex(index=temp_labels(edges)[::-1], columns=DAY_ORDER).astype(float)
+
+
+def get_temp_edges(config_path):
+    """bin edges from analysis.temp_bins in config.yaml, or the defaults"""
+    with open(config_path) as f:
+        data = yaml.safe_load(f)
+    return list((data.get("analysis") or {}).get("temp_bins") or DEFAULT_TEMP_EDGES)
@@ -0,0 +1,177 @@
+import os
+import re
+import random
+import threading
+import time
+import datetime
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.cache import ResponseCache
+from src.scheduler import throttle
+from src.metrics import record_request
+
+# statuses worth another attempt, everything else in 4xx is our own fault
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_EXCEPTIONS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+# query parameters holding credentials, masked in every message the client prints or raises
+SECRET_PARAMS = ("api_key", "token")
+_SECRET_PATTERN = re.compile(rf"\b({'|'.join(SECRET_PARAMS)})=[^&\s'\"]*")
+
+
+def redact(text):
+    """text (a URL or an error message) with the values of SECRET_PARAMS replaced by ***"""
+    return _SECRET_PATTERN.sub(r"\1=***", str(text))
+
+
+def _redacted_error(error):
+    """the same kind of requests exception, with credentials masked in its message"""
+    return type(error)(redact(error), request=error.request, response=error.response)
+
+
+def _retry_after(response):
+    """seconds to wait from a Retry-After header (either seconds or an HTTP date), or None"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((when - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0.0)
+
+
+class ApiClient:
+    """
+    Shared HTTP client for the NOAA and EIA fetchers.
+    - keeps connections alive in a pool sized for the fetch scheduler
+    - retries timeouts, connection resets, 429 and 5xx with exponential backoff and jitter
+    - honours Retry-After on 429/503
+    - gives up once the total `deadline` (seconds) for one request is spent
+    - serves JSON from an optional ResponseCache (see src/cache.py)
+    """
+
+    def __init__(self, pool_size=10, max_retries=4, backoff=1.0, max_backoff=30.0, deadline=120.0, timeout=60.0,
+                 cache=None):
+        self.cache = cache
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _delay(self, attempt, response=None):
+        if response is not None and response.status_code in (429, 503):
+            wait = _retry_after(response)
+            if wait is not None:
+                return wait
+        cap = min(self.max_backoff, self.backoff * (2 ** attempt))
+        return random.uniform(cap / 2, cap)
+
+    def get(self, url, params=None, headers=None, max_retries=None, api=None):
+        """
+        GET with retries, returns the successful response or raises the last error.
+        `api` names the rate budget ("noaa", "eia") every attempt is charged to.
+        """
+        max_retries = self.max_retries if max_retries is None else max_retries
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            remaining = self.deadline - (time.monotonic() - started)
+            response = None
+            throttle(api)
+            sent = time.perf_counter()
+            try:
+                response = self.session.get(
+                    url, params=params, headers=headers, timeout=max(min(self.timeout, remaining), 1.0)
+                )
+                record_request(api, response.status_code, time.perf_counter() - sent, len(response.content), attempt > 0)
+                if response.status_code < 400:
+                    return response
+                # requests' raise_for_status message would carry the api_key of the URL
+                error = requests.exceptions.HTTPError(
+                    f"{response.status_code} Error for url: {redact(response.url)}", response=response
+                )
+                if response.status_code not in RETRY_STATUSES:
+                    raise error
+            except RETRY_EXCEPTIONS as e:
+                record_request(api, type(e).__name__, time.perf_counter() - sent, retry=attempt > 0)
+                # connection errors quote the full request URL too
+                error = _redacted_error(e)
+
+            delay = self._delay(attempt, response)
+            elapsed = time.monotonic() - started
+            if attempt >= max_retries or elapsed + delay > self.deadline:
+                raise error
+            print(f"Attempt {attempt+1} failed: {error}. Retrying in {delay:.1f} seconds...")
+            time.sleep(delay)
+            attempt += 1
+
+    def get_json(self, url, params=None, headers=None, api=None):
+        if self.cache is None:
+            return self.get(url, params=params, headers=headers, api=api).json()
+
+        entry = self.cache.get(url, params)
+        if entry is not None and (self.cache.offline or self.cache.is_fresh(entry)):
+            record_request(api, "cache", 0.0)
+            return entry["body"]
+        if self.cache.offline:
+            raise requests.exceptions.ConnectionError(f"offline: no cached response for {url}")
+
+        if entry is not None:
+            headers = dict(headers or {}, **self.cache.conditional_headers(entry))
+        response = self.get(url, params=params, headers=headers, api=api)
+        if response.status_code == 304 and entry is not None:
+            self.cache.touch(url, params, entry)
+            return entry["body"]
+        body = response.json()
+        self.cache.put(url, params, body, response.headers)
+        return body
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def configure_client(**settings):
+    """replace the shared client, e.g. with settings from config.yaml"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = ApiClient(**settings)
+    return _client
+
+
+def get_client():
+    """
+    returns the shared client, creating it with defaults on first use.
+    Outside the pipeline (notebooks, tests) set HTTP_CACHE_DIR to cache responses,
+    and HTTP_CACHE_OFFLINE=1 to replay them without network.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            cache = None
+            if os.getenv("HTTP_CACHE_DIR"):
+                cache = ResponseCache(os.environ["HTTP_CACHE_DIR"], offline=os.getenv("HTTP_CACHE_OFFLINE") == "1")
+            _client = ApiClient(cache=cache)
+        return _client
@@ -0,0 +1,242 @@
+"""
+Timing spans and counters for one pipeline run.
+
+    run = start_run()
+    with span("write", source="weather", city="Chicago") as s:
+        s["rows"] = len(store.append(df))
+    run.finish()   # one JSON line per span plus a run summary, optional Prometheus textfile
+
+HTTP requests are recorded by the shared client (src/http_client.py) and attributed to
+the fetch job running on the current thread (see `fetch_job` and `carry`). Without a
+started run every call here is a no-op, so notebooks and tools are not affected.
+"""
+import os
+import json
+import time
+import tempfile
+import datetime
+import threading
+import contextlib
+import contextvars
+
+import yaml
+
+# fetch job ((source, label) of the scheduler call) the requests of the current thread belong to
+_job = contextvars.ContextVar("metrics_job", default=None)
+_run = None
+
+
+def get_metrics_settings(config_path):
+    with open(config_path) as f:
+        data = yaml.safe_load(f)
+    metrics = data.get("metrics") or {}
+    return {
+        "enabled": metrics.get("enabled", True),
+        "report_path": metrics.get("report_path", "./logs/pipeline_runs.jsonl"),
+        "prometheus_textfile": metrics.get("prometheus_textfile"),
+    }
+
+
+class RunMetrics:
+    """spans and per-job HTTP counters of one run, safe to update from worker threads"""
+
+    def __init__(self, report_path=None, prometheus_textfile=None):
+        self.run_id = datetime.datetime.now().strftime("%Y%m%dT%H%M%S")
+        self.started = time.time()
+        self.report_path = report_path
+        self.prometheus_textfile = prometheus_textfile
+        self.spans = []
+        self.http = {}   # (source, label) -> requests, retries, bytes, seconds, statuses
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, stage, **labels):
+        """times the block; the yielded dict takes counters such as rows or bytes"""
+        record = {"stage": stage, **labels}
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield record
+            ok = True
+        finally:
+            record["seconds"] = round(time.perf_counter() - start, 4)
+            record["ok"] = ok
+            with self.lock:
+                self.spans.append(record)
+
+    def record_request(self, api, status, seconds, nbytes=0, retry=False):
+        """one HTTP attempt (or cache hit, status "cache") of the current fetch job"""
+        job = _job.get() or (api, None)
+        with self.lock:
+            counters = self.http.setdefault(
+                job, {"requests": 0, "retries": 0, "bytes": 0, "seconds": 0.0, "statuses": {}}
+            )
+            counters["requests"] += 1
+            counters["retries"] += int(retry)
+            counters["bytes"] += nbytes
+            counters["seconds"] += seconds
+            counters["statuses"][str(status)] = counters["statuses"].get(str(status), 0) + 1
+
+    def http_counters(self, source, label):
+        counters = dict(self.http.get((source, label)) or {})
+        if counters:
+            counters["http_seconds"] = round(counters.pop("seconds"), 4)
+        return counters
+
+    def summary(self):
+        """totals per stage and source, and the HTTP counters per API"""
+        stages = {}
+        for record in self.spans:
+            key = f"{record['stage']}/{record['source']}" if "source" in record else record["stage"]
+            total = stages.setdefault(key, {"count": 0, "seconds": 0.0, "rows": 0, "bytes": 0, "failed": 0})
+            total["count"] += 1
+            total["seconds"] = round(total["seconds"] + record["seconds"], 4)
+            total["rows"] += record.get("rows", 0)
+            total["bytes"] += record.get("bytes", 0)
+            total["failed"] += int(not record["ok"])
+        http = {}
+        for (source, _), counters in self.http.items():
+            total = http.setdefault(source, {"requests": 0, "retries": 0, "bytes": 0, "statuses": {}})
+            for name in ("requests", "retries", "bytes"):
+                total[name] += counters[name]
+            for status, count in counters["statuses"].items():
+                total["statuses"][status] = total["statuses"].get(status, 0) + count
+        return {
+            "type": "run",
+            "run": self.run_id,
+            "started": datetime.datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "seconds": round(time.time() - self.started, 4),
+            "stages": stages,
+            "http": http,
+        }
+
+    def finish(self):
+        """stops recording, writes the run report and the Prometheus textfile, returns the summary"""
+        global _run
+        if _run is self:
+            _run = None
+        with self.lock:
+            # fetch spans carry the HTTP counters of their job
+            for record in self.spans:
+                if record["stage"] == "fetch":
+                    record.update(self.http_counters(record["source"], record.get("job")))
+        summary = self.summary()
+        if self.report_path:
+            os.makedirs(os.path.dirname(self.report_path) or ".", exist_ok=True)
+            with open(self.report_path, "a") as f:
+                for record in self.spans:
+                    f.write(json.dumps({"type": "span", "run": self.run_id, **record}, default=str) + "\n")
+                f.write(json.dumps(summary, default=str) + "\n")
+        if self.prometheus_textfile:
+            write_prometheus(summary, self.prometheus_textfile)
+        return summary
+
+    def report(self, summary=None):
+        """prints the time spent per stage and source, slowest first"""
+        summary = summary or self.summary()
+        print(f"Stage timings (run {self.run_id}, {summary['seconds']:.2f}s):")
+        for key, total in sorted(summary["stages"].items(), key=lambda x: x[1]["seconds"], reverse=True):
+            failed = f", {total['failed']} failed" if total["failed"] else ""
+            print(f"  {key:<20} {total['seconds']:>8.2f}s  {total['count']:>4} spans  {total['rows']:>9} rows{failed}")
+        for api, total in sorted(summary["http"].items()):
+            statuses = ", ".join(f"{status}: {count}" for status, count in sorted(total["statuses"].items()))
+            print(f"  [{api}] {total['requests']} requests, {total['retries']} retries, {total['bytes'] / 2**20:.1f} MB ({statuses})")
+
+
+def _labels(**labels):
+    return ",".join(f'{name}="{value}"' for name, value in labels.items())
+
+
+def write_prometheus(summary, path):
+    """
+    node_exporter textfile collector format, written atomically so the collector never
+    reads half a file. Only per stage / source / API totals, no per-city labels.
+    """
+    lines = [
+        "# HELP weather_energy_run_seconds Duration of the last pipeline run.",
+        "# TYPE weather_energy_run_seconds gauge",
+        f"weather_energy_run_seconds {summary['seconds']}",
+        "# HELP weather_energy_run_timestamp_seconds Start time of the last pipeline run.",
+        "# TYPE weather_energy_run_timestamp_seconds gauge",
+        f"weather_energy_run_timestamp_seconds {datetime.datetime.fromisoformat(summary['started']).timestamp():.0f}",
+    ]
+    for metric, field, help in (
+        ("stage_seconds", "seconds", "Seconds spent per stage and source in the last run."),
+        ("stage_rows", "rows", "Rows handled per stage and source in the last run."),
+        ("stage_failures", "failed", "Failed spans per stage and source in the last run."),
+    ):
+        lines += [f"# HELP weather_energy_{metric} {help}", f"# TYPE weather_energy_{metric} gauge"]
+        for key, total in sorted(summary["stages"].items()):
+            stage, _, source = key.partition("/")
+            lines.append(f"weather_energy_{metric}{{{_labels(stage=stage, source=source)}}} {total[field]}")
+    for metric, field, help in (
+        ("http_retries", "retries", "Retried HTTP requests per API in the last run."),
+        ("http_bytes", "bytes", "Response bytes per API in the last run."),
+    ):
+        lines += [f"# HELP weather_energy_{metric} {help}", f"# TYPE weather_energy_{metric} gauge"]
+        for api, total in sorted(summary["http"].items()):
+            lines.append(f"weather_energy_{metric}{{{_labels(api=api)}}} {total[field]}")
+    lines += [
+        "# HELP weather_energy_http_requests HTTP requests per API and status in the last run.",
+        "# TYPE weather_energy_http_requests gauge",
+    ]
+    for api, total in sorted(summary["http"].items()):
+        for status, count in sorted(total["statuses"].items()):
+            lines.append(f"weather_energy_http_requests{{{_labels(api=api, status=status)}}} {count}")
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+
+def start_run(report_path=None, prometheus_textfile=None):
+    """starts recording a run; spans and requests from now on go into it"""
+    global _run
+    _run = RunMetrics(report_path, prometheus_textfile)
+    return _run
+
+
+def current_run():
+    return _run
+
+
+@contextlib.contextmanager
+def span(stage, **labels):
+    """RunMetrics.span on the current run, or a plain dict when no run was started"""
+    if _run is None:
+        yield {}
+        return
+    with _run.span(stage, **labels) as record:
+        yield record
+
+
+def record_request(api, status, seconds, nbytes=0, retry=False):
+    if _run is not None:
+        _run.record_request(api, status, seconds, nbytes, retry)
+
+
+@contextlib.contextmanager
+def fetch_job(source, label):
+    """requests made inside the block (and in pools started with `carry`) count for this job"""
+    token = _job.set((source, label))
+    try:
+        yield
+    finally:
+        _job.reset(token)
+
+
+def carry(func):
+    """wraps func so it runs in the fetch job of the caller, for ThreadPoolExecutor.map"""
+    job = _job.get()
+
+    def run(*args, **kwargs):
+        token = _job.set(job)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _job.reset(token)
+    return run
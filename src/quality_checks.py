@@ -1,13 +1,169 @@
-import pandas as pd
 import datetime
+from dataclasses import dataclass, field
+
+import yaml
+import numpy as np
+import pandas as pd
+
+from src.transform import PROCESSED_KEYS, delta_columns, as_dates, key_index
+
+# limits applied to every city unless config.yaml quality.cities overrides them
+DEFAULT_THRESHOLDS = {
+    "tmax_max": 130.0,      # °F
+    "tmin_min": -50.0,      # °F
+    "demand_min": 0.0,      # MWh
+    "max_age_days": 1,      # days a city's latest data may lag behind today
+}
+# (column, threshold, direction, reason) of the range checks
+RANGE_CHECKS = [
+    ("TMAX", "tmax_max", "above", "TMAX > {:g}°F"),
+    ("TMIN", "tmin_min", "below", "TMIN < {:g}°F"),
+    ("Demand", "demand_min", "below", "Demand < {:g}"),
+]
+OUTLIER_COLUMNS = ["date", "city", "state", "TMAX", "TMIN", "Demand", "Net generation", "value-units", "reason"]
+
+
+def get_quality_settings(config_path):
+    """{"default": thresholds, "cities": {city: thresholds}} from the quality section of config.yaml"""
+    with open(config_path) as f:
+        data = yaml.safe_load(f)
+    quality = data.get("quality") or {}
+    default = dict(DEFAULT_THRESHOLDS, **(quality.get("thresholds") or {}))
+    cities = {city: dict(default, **(limits or {})) for city, limits in (quality.get("cities") or {}).items()}
+    return {"default": default, "cities": cities}
+
+
+@dataclass
+class QualityReport:
+    """
+    result of run_quality_checks. missing / outliers hold the offending rows (outliers
+    with a reason column), freshness one row per city; rows is how many rows were checked.
+    """
+    rows: int
+    missing: pd.DataFrame
+    outliers: pd.DataFrame
+    freshness: pd.DataFrame
+    checked_on: datetime.date = field(default_factory=datetime.date.today)
+
+    @property
+    def ok(self):
+        return self.missing.empty and self.outliers.empty and bool(self.freshness["fresh"].all())
+
+    def summary(self):
+        return {
+            "rows": self.rows,
+            "missing": len(self.missing),
+            "outliers": len(self.outliers),
+            "stale_cities": sorted(self.freshness.loc[~self.freshness["fresh"], "city"]),
+        }
+
+    def freshness_messages(self):
+        """the per-city sentences report_city_freshness has always returned"""
+        messages = []
+        for row in self.freshness.itertuples(index=False):
+            last_date = row.last_date.date()
+            if not row.fresh:
+                start_missing = last_date + datetime.timedelta(days=1)
+                messages.append(
+                    f"{row.city} is missing Temperature and Energy data from {start_missing.isoformat()} to {self.checked_on.isoformat()}"
+                )
+            else:
+                messages.append(f"{row.city} - Temeperature and Energy data is up-to-date. ({row.city} has data up to {last_date.isoformat()})")
+        return messages
+
+
+def _city_limits(cities, settings):
+    """per-row threshold columns: the city's override where there is one, else the default"""
+    settings = settings or {"default": DEFAULT_THRESHOLDS, "cities": {}}
+    limits = {}
+    for name, default in settings["default"].items():
+        overrides = {city: values[name] for city, values in settings["cities"].items() if name in values}
+        column = cities.map(overrides).fillna(default) if overrides else pd.Series(default, index=cities.index)
+        limits[name] = column.to_numpy(dtype=float)
+    return limits
+
+
+def _freshness(last, settings, today):
+    """last -> latest date per city"""
+    max_age = _city_limits(pd.Series(last.index.astype(str)), settings)["max_age_days"]
+    days_behind = (pd.Timestamp(today) - last).dt.days.to_numpy()
+    return pd.DataFrame({
+        "city": last.index.astype(str),
+        "last_date": last.to_numpy(),
+        "days_behind": days_behind,
+        "fresh": days_behind <= max_age,
+    })
+
+
+def run_quality_checks(df, settings=None, today=None, previous=None):
+    """
+    every check in one columnar pass over df, without modifying it:
+      - missing: rows with an empty measured value (the derived % change columns are ignored)
+      - outliers: TMAX above tmax_max, TMIN below tmin_min, Demand below demand_min
+      - freshness: latest date per city against max_age_days
+    Thresholds are per city (get_quality_settings). With `previous` (the report of the
+    data before df was added) only df is checked: its rows replace the same
+    (date, city, state) in the previous findings and the freshness dates move forward.
+    """
+    today = today or datetime.date.today()
+    cities = df["city"].astype(str)
+    dates = pd.to_datetime(df["date"], format="ISO8601").dt.normalize()
+    limits = _city_limits(cities, settings)
+
+    measured = [col for col in df.columns if col not in delta_columns()]
+    missing_mask = df[measured].isna().to_numpy().any(axis=1)
+
+    reasons = np.full(len(df), "", dtype=object)
+    for col, name, direction, label in RANGE_CHECKS:
+        if col not in df.columns:
+            continue
+        values = df[col].to_numpy(dtype=float)
+        failed = values > limits[name] if direction == "above" else values < limits[name]
+        if failed.any():
+            text = np.array([label.format(limit) for limit in limits[name][failed]], dtype=object)
+            reasons[failed] = np.where(reasons[failed] == "", text, reasons[failed] + "; " + text)
+    outlier_mask = reasons != ""
+
+    outliers = df.loc[outlier_mask].assign(reason=reasons[outlier_mask])
+    outliers = outliers.reindex(columns=[col for col in OUTLIER_COLUMNS if col in outliers.columns])
+    report = QualityReport(
+        rows=len(df),
+        missing=df.loc[missing_mask],
+        outliers=outliers.reset_index(drop=True),
+        freshness=_freshness(dates.groupby(cities).max(), settings, today),
+        checked_on=today,
+    )
+    if previous is not None:
+        report = _update(previous, report, df, settings, today)
+    return report
+
+
+def _update(previous, report, new_rows, settings, today):
+    """previous findings for rows not in new_rows, plus the findings on new_rows"""
+    checked = key_index(new_rows)
+
+    def combine(old, new):
+        if old.empty:
+            return new
+        # stored findings and new ones both get datetime dates, mixed types would not sort or match
+        old = old.assign(date=as_dates(old["date"]))
+        new = new.assign(date=as_dates(new["date"]))
+        replaced = key_index(old).isin(checked)
+        return pd.concat([old[~replaced], new], ignore_index=True).sort_values(PROCESSED_KEYS, kind="stable")
+
+    last_dates = pd.concat([previous.freshness, report.freshness]).groupby("city")["last_date"].max()
+    return QualityReport(
+        rows=report.rows,
+        missing=combine(previous.missing, report.missing),
+        outliers=combine(previous.outliers, report.outliers),
+        freshness=_freshness(last_dates, settings, today),
+        checked_on=today,
+    )
+
 
 def missing_values(df):
     """returns the number of missing values per column and where the data is incomplete"""
-    # df = pd.read_csv(csv)
-    # counts = df[df.isna.sum()].to_dict()
-    rows = df[df.isna().any(axis=1)]
-    return rows
-    # return {"counts": counts, "rows": rows}
+    return run_quality_checks(df).missing
 
 def outliers(df):
     """Returns rows where weather or energy values are outside expected ranges.
@@ -15,14 +171,7 @@ def outliers(df):
         - Any energy column (Demand, Net Generation) < 0
     why: catching errors or bad API data
     """
-    
-    bad_weather = df[(df["TMAX"]>130.0) | (df["TMIN"]<-50.0)][["date", "city", "state", "TMAX", "TMIN"]]
-    bad_energy = df[df["Demand"]<0][["date", "city", "state", "Demand", "Net generation", "value-units"]]
-    if not bad_weather.empty  or not bad_energy.empty:
-        return pd.concat([bad_weather, bad_energy], axis=0, ignore_index=True)
-    else:
-        return []
-        # return f"No outliers detected"
+    return run_quality_checks(df).outliers
 
 
 
@@ -31,34 +180,5 @@ def report_city_freshness(df, date_col="date", city_col="city"):
     Flags cities without fresh data
     why: To ensure data freshness
     """
-
-
-    # 1) Load and normalize
-    # df = pd.read_csv(csv_path) 
-    # 2) Parse date and keep just the date part
-    df[date_col] = pd.to_datetime(df[date_col]).dt.date
-    
-
-    today = datetime.date.today()
-
-    reports = []
-    # 3) For each city
-    for city, grp in df.groupby(city_col):
-
-        last_date = grp[date_col].max()      # get the last date for city
-        
-        # if it's a datetime.datetime, convert it
-        if isinstance(last_date, datetime.datetime):
-            last_date = last_date.date()
-        if (today - last_date).days > 1:
-            
-            start_missing = last_date + datetime.timedelta(days=1)
-            end_missing   = today
-            reports.append(
-                f"{city} is missing Temperature and Energy data from {start_missing.isoformat()} to {end_missing.isoformat()}"
-            )
-        else:
-            reports.append(f"{city} - Temeperature and Energy data is up-to-date. ({city} has data up to {last_date.isoformat()})")
-    return reports
-
-    
\ No newline at end of file
+    df = df.rename(columns={date_col: "date", city_col: "city"})
+    return run_quality_checks(df[["date", "city"]]).freshness_messages()
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+# sufficient statistics of a simple linear regression y = a + b*x
+STAT_COLUMNS = ["n", "sx", "sy", "sxy", "sxx", "syy"]
+
+
+def sufficient_stats(df, x="TAVG", y="Demand", by=("city", "date")):
+    """
+    per-group n, Σx, Σy, Σxy, Σx², Σy² over the rows where both x and y are present.
+    Stats of any selection of groups are just the column sums of the selected rows,
+    so they can be computed once (e.g. in the pipeline) and reused for every filter.
+    """
+    by = list(by)
+    valid = df[x].notna() & df[y].notna()
+    xs = df.loc[valid, x].to_numpy(dtype=float)
+    ys = df.loc[valid, y].to_numpy(dtype=float)
+    stats = df.loc[valid, by].reset_index(drop=True)
+    stats["n"] = 1
+    stats["sx"] = xs
+    stats["sy"] = ys
+    stats["sxy"] = xs * ys
+    stats["sxx"] = xs * xs
+    stats["syy"] = ys * ys
+    return stats.groupby(by, observed=True, sort=False)[STAT_COLUMNS].sum().reset_index()
+
+
+def _fit(n, sx, sy, sxy, sxx, syy):
+    """closed-form OLS from the sums, works on scalars or arrays"""
+    n = np.asarray(n, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        slope = cov / var_x
+        intercept = (sy - slope * sx) / n
+        r = cov / np.sqrt(var_x * var_y)
+    return {"n": n, "slope": slope, "intercept": intercept, "r_squared": r * r, "r": r}
+
+
+def fit(stats):
+    """slope, intercept, R² and r of everything in `stats` (output of sufficient_stats)"""
+    sums = stats[STAT_COLUMNS].sum()
+    return {key: float(value) for key, value in _fit(*(sums[col] for col in STAT_COLUMNS)).items()}
+
+
+def fit_by(stats, by="city"):
+    """one fit per group (e.g. per city) in a single grouped pass"""
+    sums = stats.groupby(by, observed=True)[STAT_COLUMNS].sum()
+    fits = _fit(*(sums[col].to_numpy(dtype=float) for col in STAT_COLUMNS))
+    return pd.DataFrame(fits, index=sums.index).reset_index()
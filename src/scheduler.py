@@ -0,0 +1,139 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.metrics import span, fetch_job
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+    `rate` tokens are added per second, up to `burst` tokens can be spent at once.
+    why: respect each API's request budget without fixed sleeps between cities
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = max(float(burst), 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """blocks until a token is available, returns the seconds spent waiting"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+# buckets shared by every request to an API, filled by set_rate_limits
+_buckets = {}
+_DONE = object()
+
+
+def set_rate_limits(rate_limits):
+    """install one token bucket per API, e.g. {"noaa": {"rate": 4, "burst": 4}}"""
+    global _buckets
+    _buckets = {
+        api: TokenBucket(limit.get("rate", 1), limit.get("burst", 1))
+        for api, limit in rate_limits.items()
+    }
+
+
+def throttle(api):
+    """take a token from the API's bucket before a request, returns the seconds waited"""
+    bucket = _buckets.get(api)
+    return bucket.acquire() if bucket else 0.0
+
+
+def _drain(items):
+    while True:
+        ok, item = items.get()
+        if not ok:
+            raise item
+        if item is _DONE:
+            return
+        yield item
+
+
+class FetchScheduler:
+    """
+    Runs fetch calls on a thread pool. Every HTTP request the calls make takes a token
+    from its API's bucket (see `throttle`), so paging and retries stay within budget too.
+    Latency of every call is kept in `self.latencies` for reporting, and each call is a
+    "fetch" span of the current metrics run (src/metrics.py) with its HTTP counters.
+    """
+
+    def __init__(self, rate_limits, max_workers=4):
+        set_rate_limits(rate_limits)
+        self.pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.latencies = []
+        self.lock = threading.Lock()
+
+    def submit(self, api, label, func, *args, **kwargs):
+        """schedule `func(*args, **kwargs)`, returns a Future"""
+        return self.pool.submit(self._run, api, label, func, *args, **kwargs)
+
+    def stream(self, api, label, func, *args, **kwargs):
+        """
+        like submit, for generator functions: returns an iterator that hands over
+        each item as soon as the worker produces it, and re-raises worker errors
+        """
+        items = queue.Queue()
+
+        def produce():
+            try:
+                for item in func(*args, **kwargs):
+                    items.put((True, item))
+            except Exception as e:
+                items.put((False, e))
+                raise
+            items.put((True, _DONE))
+
+        self.submit(api, label, produce)
+        return _drain(items)
+
+    def _run(self, api, label, func, *args, **kwargs):
+        start = time.perf_counter()
+        ok = False
+        try:
+            with fetch_job(api, label), span("fetch", source=api, job=label):
+                result = func(*args, **kwargs)
+            ok = True
+            return result
+        finally:
+            with self.lock:
+                self.latencies.append({
+                    "api": api,
+                    "request": label,
+                    "latency": round(time.perf_counter() - start, 3),
+                    "ok": ok,
+                })
+
+    def report(self):
+        """prints the latency of every request, slowest first"""
+        if not self.latencies:
+            return
+        print("Request latencies:")
+        for item in sorted(self.latencies, key=lambda x: x["latency"], reverse=True):
+            status = "ok" if item["ok"] else "failed"
+            print(f"  [{item['api']}] {item['request']}: {item['latency']:.2f}s ({status})")
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
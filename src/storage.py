@@ -0,0 +1,259 @@
+import os
+import uuid
+
+import yaml
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # parquet backend is optional, the CSV files keep working without it
+    pa = None
+
+# column order of the raw CSV files, new rows are always written in this order
+RAW_COLUMNS = {
+    "weather": ["date", "datatype", "station", "attributes", "value", "city", "state"],
+    "energy": [
+        "period", "respondent", "respondent-name", "type", "type-name", "timezone",
+        "timezone-description", "value", "value-units", "city", "state",
+    ],
+}
+DATE_COLUMN = {"weather": "date", "energy": "period"}
+CATEGORY_COLUMNS = {
+    "weather": ["datatype", "station", "state"],
+    "energy": [
+        "respondent", "respondent-name", "type", "type-name", "timezone",
+        "timezone-description", "value-units", "state",
+    ],
+}
+# a raw row is identified by these columns, rows already stored are skipped on append
+KEY_COLUMNS = {
+    "weather": ["date", "station", "datatype", "city"],
+    "energy": ["period", "respondent", "type", "city"],
+}
+# rewrite a partition into one file once daily appends leave this many small files
+COMPACT_AFTER_FILES = 32
+
+
+def _arrow_schema(kind):
+    fields = []
+    for col in RAW_COLUMNS[kind]:
+        if col == "city":
+            continue
+        if col == DATE_COLUMN[kind]:
+            fields.append((col, pa.date32()))
+        elif col == "value":
+            fields.append((col, pa.float64()))
+        elif col in CATEGORY_COLUMNS[kind]:
+            fields.append((col, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append((col, pa.string()))
+    return pa.schema(fields)
+
+
+def _partitioning():
+    # city and year are not stored in the files, they come from the partition directories
+    return ds.partitioning(
+        pa.schema([("city", pa.dictionary(pa.int32(), pa.string())), ("year", pa.int16())]),
+        flavor="hive",
+        dictionaries="infer",
+    )
+
+
+class RawStore:
+    """
+    Raw weather or energy rows on disk.
+    - backend "parquet": typed columns, partitioned by city and year under `parquet_root`,
+      reads push date and city filters down to the files
+    - backend "csv": the original append-only CSV
+    With `csv_export` the CSV is still appended next to the parquet files, so notebooks
+    and anything else reading data/raw/*.csv keep working.
+
+    Appends are idempotent: a hash of each row's key is kept in an append-only index
+    file next to the CSV, so re-fetched rows are dropped in O(new rows).
+    """
+
+    def __init__(self, kind, csv_path, backend="parquet", parquet_root=None, csv_export=True):
+        if backend == "parquet" and pa is None:
+            print("⚠️ Warning: pyarrow is not installed, falling back to the CSV backend")
+            backend = "csv"
+        self.kind = kind
+        self.csv_path = csv_path
+        self.backend = backend
+        self.root = parquet_root
+        self.csv_export = csv_export or backend == "csv"
+        self.date_col = DATE_COLUMN[kind]
+        self.index_path = os.path.splitext(csv_path)[0] + ".keys"
+        self._index = None
+
+        if backend == "parquet" and not self._has_parquet() and os.path.exists(csv_path):
+            self.migrate_from_csv()
+
+    def _has_parquet(self):
+        if not os.path.isdir(self.root):
+            return False
+        for _, _, files in os.walk(self.root):
+            if any(f.endswith(".parquet") for f in files):
+                return True
+        return False
+
+    def _typed(self, df):
+        df = df.copy()
+        df[self.date_col] = pd.to_datetime(df[self.date_col], format="ISO8601").dt.normalize()
+        df["value"] = pd.to_numeric(df["value"], errors="coerce")
+        if "attributes" in df:
+            df["attributes"] = df["attributes"].astype("string")
+        return df
+
+    def _write_parquet(self, df):
+        df = self._typed(df)
+        df["year"] = df[self.date_col].dt.year
+        schema = _arrow_schema(self.kind)
+        for (city, year), part in df.groupby(["city", "year"], sort=False):
+            part_dir = os.path.join(self.root, f"city={city}", f"year={year}")
+            os.makedirs(part_dir, exist_ok=True)
+            table = pa.Table.from_pandas(part[schema.names], schema=schema, preserve_index=False)
+            pq.write_table(table, os.path.join(part_dir, f"part-{uuid.uuid4().hex}.parquet"))
+            self._maybe_compact(part_dir)
+
+    def _maybe_compact(self, part_dir):
+        files = [f for f in os.listdir(part_dir) if f.endswith(".parquet")]
+        if len(files) < COMPACT_AFTER_FILES:
+            return
+        table = pa.concat_tables([pq.read_table(os.path.join(part_dir, f)) for f in files])
+        tmp = os.path.join(part_dir, f"part-{uuid.uuid4().hex}.parquet.tmp")
+        pq.write_table(table, tmp)
+        os.replace(tmp, tmp[:-len(".tmp")])
+        for f in files:
+            os.remove(os.path.join(part_dir, f))
+
+    def migrate_from_csv(self):
+        """one-off import of the existing CSV into the parquet store"""
+        df = pd.read_csv(self.csv_path)
+        if not df.empty:
+            self._write_parquet(df)
+        print(f"Imported {len(df)} {self.kind} rows from {self.csv_path} into {self.root}")
+
+    def _key_hashes(self, df):
+        keys = df[KEY_COLUMNS[self.kind]].astype(str)
+        keys[self.date_col] = pd.to_datetime(df[self.date_col], format="ISO8601").dt.strftime("%Y-%m-%d")
+        return pd.util.hash_pandas_object(keys, index=False).to_numpy(dtype=np.uint64)
+
+    def _load_index(self):
+        if self._index is None:
+            if not os.path.exists(self.index_path):
+                self.rebuild_index()
+            else:
+                self._index = set(np.fromfile(self.index_path, dtype=np.uint64).tolist())
+        return self._index
+
+    def rebuild_index(self):
+        """recreates the key index from the stored rows"""
+        stored = self.read(columns=KEY_COLUMNS[self.kind])
+        hashes = np.unique(self._key_hashes(stored)) if not stored.empty else np.array([], dtype=np.uint64)
+        hashes.tofile(self.index_path)
+        self._index = set(hashes.tolist())
+        return len(self._index)
+
+    def append(self, df):
+        """
+        add raw rows (as returned by the API plus city and state), skipping rows whose
+        key is already stored. Returns the rows that were actually written.
+        """
+        df = df.reindex(columns=RAW_COLUMNS[self.kind])
+        if df.empty:
+            return df
+        index = self._load_index()
+        hashes = self._key_hashes(df)
+        fresh = ~pd.Series(hashes).isin(index).to_numpy() & ~pd.Series(hashes).duplicated().to_numpy()
+        df, hashes = df[fresh], hashes[fresh]
+        if df.empty:
+            return df
+
+        if self.backend == "parquet":
+            self._write_parquet(df)
+        if self.csv_export:
+            df.to_csv(self.csv_path, mode="a", header=not os.path.exists(self.csv_path), index=False)
+        # the index only grows, new hashes are appended to the end of the file
+        with open(self.index_path, "ab") as f:
+            hashes.tofile(f)
+        index.update(hashes.tolist())
+        return df
+
+    def read(self, columns=None, start=None, end=None, cities=None):
+        """
+        rows with the date column between start and end (inclusive) for the given cities.
+        The date column comes back as datetime64, labels as categoricals on the parquet backend.
+        """
+        if self.backend == "parquet" and self._has_parquet():
+            return self._read_parquet(columns, start, end, cities)
+        return self._read_csv(columns, start, end, cities)
+
+    def _read_parquet(self, columns, start, end, cities):
+        dataset = ds.dataset(self.root, format="parquet", partitioning=_partitioning())
+        expr = None
+        if start is not None:
+            expr = ds.field(self.date_col) >= pd.Timestamp(start).date()
+            # prunes whole year directories before any file is opened
+            expr &= ds.field("year") >= pd.Timestamp(start).year
+        if end is not None:
+            cond = (ds.field(self.date_col) <= pd.Timestamp(end).date()) & (ds.field("year") <= pd.Timestamp(end).year)
+            expr = cond if expr is None else expr & cond
+        if cities is not None:
+            cond = ds.field("city").isin(list(cities))
+            expr = cond if expr is None else expr & cond
+        columns = list(columns) if columns else RAW_COLUMNS[self.kind]
+        table = dataset.to_table(columns=columns, filter=expr)
+        return table.to_pandas(date_as_object=False)
+
+    def _read_csv(self, columns, start, end, cities):
+        if not os.path.exists(self.csv_path):
+            return pd.DataFrame(columns=columns or RAW_COLUMNS[self.kind])
+        df = pd.read_csv(self.csv_path, usecols=columns)
+        if self.date_col in df:
+            df[self.date_col] = pd.to_datetime(df[self.date_col], format="ISO8601").dt.normalize()
+            if start is not None:
+                df = df[df[self.date_col] >= pd.Timestamp(start)]
+            if end is not None:
+                df = df[df[self.date_col] <= pd.Timestamp(end)]
+        if cities is not None:
+            df = df[df["city"].isin(list(cities))]
+        return df.reset_index(drop=True)
+
+    def export_csv(self, path=None):
+        """writes the full parquet store back out as a CSV in the original column order"""
+        path = path or self.csv_path
+        df = self.read()
+        df[self.date_col] = df[self.date_col].dt.strftime(
+            "%Y-%m-%dT%H:%M:%S" if self.kind == "weather" else "%Y-%m-%d"
+        )
+        df.reindex(columns=RAW_COLUMNS[self.kind]).to_csv(path, index=False)
+        return path
+
+
+def get_storage_settings(config_path):
+    with open(config_path) as f:
+        data = yaml.safe_load(f)
+    storage = data.get("storage") or {}
+    return {
+        "backend": storage.get("backend", "parquet"),
+        "parquet_root": storage.get("parquet_root", "./data/raw/parquet"),
+        "csv_export": storage.get("csv_export", True),
+    }
+
+
+def open_raw_stores(config_path, raw_dir="./data/raw"):
+    """returns (weather_store, energy_store) configured from config.yaml"""
+    settings = get_storage_settings(config_path)
+    stores = []
+    for kind, csv_name in (("weather", "all_weather.csv"), ("energy", "all_energy.csv")):
+        stores.append(RawStore(
+            kind,
+            os.path.join(raw_dir, csv_name),
+            backend=settings["backend"],
+            parquet_root=os.path.join(settings["parquet_root"], kind),
+            csv_export=settings["csv_export"],
+        ))
+    return tuple(stores)
@@ -0,0 +1,266 @@
+import os
+
+import yaml
+import numpy as np
+import pandas as pd
+
+from src.metrics import span
+
+PROCESSED_KEYS = ["date", "city", "state"]
+# % change columns added to the processed rows: metric -> suffix -> days back
+DELTA_METRICS = ["Demand", "Net generation"]
+DELTA_PERIODS = {"": 1, "_wow": 7}
+# temperature columns of the processed rows, present even when a batch has none of them
+WEATHER_TYPES = ["TMAX", "TMIN"]
+# raw columns the pivot step needs
+WEATHER_COLUMNS = ["date", "datatype", "value", "city", "state"]
+ENERGY_COLUMNS = ["period", "respondent-name", "timezone", "city", "state", "value-units", "type-name", "value"]
+# in-memory schema of the processed rows (read_processed): labels repeated on every row are
+# categoricals, the date is parsed once, measurements are float32 wherever that is lossless
+PROCESSED_CATEGORIES = ["city", "state", "respondent-name", "timezone", "value-units"]
+PROCESSED_DATE_FORMAT = "%Y-%m-%d"
+
+
+def get_processing_settings(config_path):
+    """mode "incremental" upserts only the newly fetched days, "full" rebuilds the processed file"""
+    with open(config_path) as f:
+        data = yaml.safe_load(f)
+    processing = data.get("processing") or {}
+    return {"mode": processing.get("mode", "incremental")}
+
+
+def _plain_labels(df, columns):
+    # categoricals from the parquet store would order the pivot by category, not alphabetically
+    return df.astype({col: str for col in columns if isinstance(df[col].dtype, pd.CategoricalDtype)})
+
+
+def as_dates(values):
+    """values as datetime64, parsed only when they are not already"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return pd.to_datetime(values, format="ISO8601")
+
+
+def key_index(df):
+    """(date, city, state) of each row as a MultiIndex of strings, the same whatever the date dtype"""
+    return pd.MultiIndex.from_arrays([
+        as_dates(df["date"]).dt.strftime(PROCESSED_DATE_FORMAT),
+        df["city"].astype(str),
+        df["state"].astype(str),
+    ], names=PROCESSED_KEYS)
+
+
+def _downcast(values):
+    """float32 when every value survives the round trip (temperatures, MWh below 2**24), else unchanged"""
+    narrow = values.astype(np.float32)
+    if np.array_equal(narrow.to_numpy(dtype=float), values.to_numpy(dtype=float), equal_nan=True):
+        return narrow
+    return values
+
+
+def as_processed_schema(df):
+    """
+    processed rows in the canonical dtypes: datetime64 date, categorical labels, numbers
+    downcast where lossless. A frame that already has them is returned as it is, so
+    every caller can ask for the schema without paying for a second conversion.
+    """
+    categories = [col for col in PROCESSED_CATEGORIES if col in df.columns]
+    if (
+        pd.api.types.is_datetime64_any_dtype(df["date"])
+        and all(isinstance(df[col].dtype, pd.CategoricalDtype) for col in categories)
+    ):
+        return df
+    return _typed(df, categories)
+
+
+def _typed(df, categories):
+    columns = {"date": as_dates(df["date"])}
+    for col in categories:
+        columns[col] = df[col].astype("category")
+    for col in df.columns:
+        if col not in columns and pd.api.types.is_float_dtype(df[col]):
+            columns[col] = _downcast(df[col])
+    return df.assign(**columns)
+
+
+def read_processed(path, columns=None):
+    """the processed CSV in the canonical schema (as_processed_schema), optionally only some columns"""
+    df = pd.read_csv(
+        path, usecols=columns, dtype={col: "category" for col in PROCESSED_CATEGORIES},
+        float_precision="round_trip",
+    )
+    df["date"] = pd.to_datetime(df["date"], format=PROCESSED_DATE_FORMAT)
+    return _typed(df, [col for col in PROCESSED_CATEGORIES if col in df.columns])
+
+
+def pivot_weather(weather):
+    """one row per (date, city, state) with TMAX, TMIN and their average TAVG"""
+    weather = _plain_labels(weather, ["datatype", "city", "state"])
+    weather["date"] = pd.to_datetime(weather["date"]).dt.date   # convert to proper date format
+    weather_pivot = weather.pivot_table(
+        index=["date", "city", "state"],
+        columns="datatype",
+        values="value",
+        observed=True
+    ).reset_index()
+    # a day (or a whole keyed batch) may have only TMIN, or no weather at all yet
+    index = ["date", "city", "state"]
+    extra = [col for col in weather_pivot.columns if col not in index + WEATHER_TYPES]
+    weather_pivot = weather_pivot.reindex(columns=index + WEATHER_TYPES + extra)
+
+    # Calculate average temperature
+    weather_pivot['TAVG'] = (weather_pivot['TMAX'] + weather_pivot['TMIN']) / 2
+    return weather_pivot
+
+
+def pivot_energy(energy):
+    """one row per (date, city, respondent) with a column per EIA type (Demand, Net generation)"""
+    # rename period to date and convert to proper date format
+    energy_df = _plain_labels(energy, ["respondent-name", "timezone", "city", "state", "value-units", "type-name"])
+    energy_df = energy_df.rename(columns={"period": "date"})
+    energy_df["date"] = pd.to_datetime(energy_df["date"]).dt.date
+    energy_pivot = energy_df.pivot_table(
+        index=['date', 'respondent-name', "timezone", "city", "state", "value-units"],
+        columns=["type-name"],
+        values="value",
+        observed=True
+    ).reset_index()
+    return energy_pivot
+
+
+def merge_weather_energy(weather_pivot, energy_pivot):
+    return pd.merge(weather_pivot, energy_pivot, on=["date", "city", "state"], how="inner")
+
+
+def build_processed(weather_store, energy_store, keys=None):
+    """
+    pivots and merges raw rows into the processed layout.
+    With `keys` (a frame of date, city) only those days are read and pivoted:
+    the store reads are limited to the key cities and date range, then trimmed to the keys.
+    """
+    with span("read") as record:
+        if keys is None:
+            weather = weather_store.read(columns=WEATHER_COLUMNS)
+            energy = energy_store.read(columns=ENERGY_COLUMNS)
+        else:
+            keys = keys.assign(date=pd.to_datetime(keys["date"], format="ISO8601").dt.normalize()).drop_duplicates()
+            cities = sorted(keys["city"].unique())
+            start, end = keys["date"].min(), keys["date"].max()
+            weather = weather_store.read(columns=WEATHER_COLUMNS, start=start, end=end, cities=cities)
+            energy = energy_store.read(columns=ENERGY_COLUMNS, start=start, end=end, cities=cities)
+            weather = _only_keys(weather, "date", keys)
+            energy = _only_keys(energy, "period", keys)
+        record["rows"] = len(weather) + len(energy)
+
+    with span("pivot", source="noaa", rows=len(weather)):
+        weather_pivot = pivot_weather(weather)
+    with span("pivot", source="eia", rows=len(energy)):
+        energy_pivot = pivot_energy(energy)
+    with span("merge") as record:
+        merged = merge_weather_energy(weather_pivot, energy_pivot)
+        record["rows"] = len(merged)
+    return merged
+
+
+def _only_keys(df, date_col, keys):
+    dates = pd.to_datetime(df[date_col]).dt.normalize()
+    wanted = pd.MultiIndex.from_frame(keys[["date", "city"]].astype({"city": str}))
+    mask = pd.MultiIndex.from_arrays([dates, df["city"].astype(str)]).isin(wanted)
+    return df[mask]
+
+
+def delta_columns():
+    """names of the % change columns, e.g. Demand_pct_change (day over day), Demand_pct_change_wow"""
+    return [f"{metric}_pct_change{suffix}" for suffix in DELTA_PERIODS for metric in DELTA_METRICS]
+
+
+def add_deltas(df, context=None):
+    """
+    day-over-day and week-over-week % change of DELTA_METRICS per city, as new columns
+    (rounded to 2 decimals, empty when the earlier day is missing or zero).
+    The earlier value is looked up by calendar date, not by row position, so gaps in
+    the data never compare against the wrong day. `context` holds earlier processed rows
+    (e.g. the last week already on disk) used only as lookup values.
+    Returns a new frame sorted by (date, city, state); df itself is not modified.
+    """
+    out = df.drop(columns=[col for col in delta_columns() if col in df.columns])
+    out = out.sort_values(PROCESSED_KEYS, kind="stable").reset_index(drop=True)
+    metrics = [metric for metric in DELTA_METRICS if metric in out.columns]
+
+    lookup = out[["date", "city"] + metrics]
+    if context is not None and not context.empty:
+        lookup = pd.concat([context[["date", "city"] + metrics], lookup], ignore_index=True)
+    lookup = lookup.assign(date=pd.to_datetime(lookup["date"]).dt.normalize(), city=lookup["city"].astype(str))
+    lookup = lookup.drop_duplicates(["date", "city"], keep="last").set_index(["date", "city"])[metrics]
+
+    dates = pd.to_datetime(out["date"]).dt.normalize()
+    cities = out["city"].astype(str)
+    for suffix, days in DELTA_PERIODS.items():
+        earlier = lookup.reindex(pd.MultiIndex.from_arrays([dates - pd.Timedelta(days=days), cities]))
+        for metric in metrics:
+            current = out[metric].to_numpy(dtype=float)
+            before = earlier[metric].to_numpy(dtype=float)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                pct = np.round((current - before) / before * 100, 2)
+            pct[~np.isfinite(pct)] = np.nan
+            out[f"{metric}_pct_change{suffix}"] = pct
+    return out
+
+
+def _context_rows(path, start):
+    """metric columns of the processed rows dated on or after `start` (lookup values for add_deltas)"""
+    available = pd.read_csv(path, nrows=0).columns
+    columns = ["date", "city"] + [metric for metric in DELTA_METRICS if metric in available]
+    rows = pd.read_csv(path, usecols=columns, dtype={"date": str}, float_precision="round_trip")
+    return rows[rows["date"] >= start]
+
+
+def _last_date(path):
+    """date of the last row; the processed file is kept in date order so this is its max"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(f.tell() - 4096, 0))
+        lines = [line for line in f.read().decode().splitlines() if line.strip()]
+    if len(lines) < 2 and os.path.getsize(path) <= 4096:
+        return None   # header only
+    return lines[-1].split(",", 1)[0]
+
+
+def upsert_processed(new_rows, output_path):
+    """
+    writes freshly pivoted rows into the processed CSV, replacing rows with the same
+    (date, city, state). When every new row is later than what the file already holds
+    the rows are simply appended, otherwise the file is rewritten in (date, city) order.
+    The % change columns (add_deltas) are filled in for the new rows, and for the whole
+    file when it is rewritten so later days see back-filled values.
+    Returns the number of rows written.
+    """
+    if new_rows.empty:
+        return 0
+    new_rows = new_rows.copy()
+    new_rows["date"] = new_rows["date"].astype(str)
+    for col in ("city", "state"):
+        new_rows[col] = new_rows[col].astype(str)
+
+    if not os.path.exists(output_path):
+        add_deltas(new_rows).to_csv(output_path, index=False)
+        return len(new_rows)
+
+    columns = pd.read_csv(output_path, nrows=0).columns
+    if set(new_rows.columns) | set(delta_columns()) <= set(columns):
+        last_date = _last_date(output_path)
+        if last_date is None or new_rows["date"].min() > last_date:
+            # only the last week on disk is needed to compute the new rows' changes
+            week_before = str((pd.Timestamp(new_rows["date"].min()) - pd.Timedelta(days=max(DELTA_PERIODS.values()))).date())
+            new_rows = add_deltas(new_rows, context=_context_rows(output_path, week_before))
+            new_rows.reindex(columns=columns).to_csv(output_path, mode="a", header=False, index=False)
+            return len(new_rows)
+
+    # overlapping or back-filled days: drop the stale versions and rewrite in order
+    existing = pd.read_csv(output_path, dtype={"date": str}, float_precision="round_trip")
+    stale = pd.MultiIndex.from_frame(existing[PROCESSED_KEYS]).isin(
+        pd.MultiIndex.from_frame(new_rows[PROCESSED_KEYS])
+    )
+    combined = pd.concat([existing[~stale], new_rows], ignore_index=True)
+    add_deltas(combined).to_csv(output_path, index=False)
+    return len(new_rows)
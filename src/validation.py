@@ -0,0 +1,144 @@
+"""
+Checks raw API rows before they are written: schema, parseable dates and values,
+physically possible temperatures and duplicates. Rows that fail are kept out of the
+raw store and appended with their reasons to a quarantine file per source, e.g.
+data/quarantine/weather.csv. Plausibility limits (quality.thresholds / quality.cities)
+are not applied here: those rows are stored and flagged by the quality checks.
+"""
+import os
+import datetime
+
+import yaml
+import numpy as np
+import pandas as pd
+
+from src.storage import KEY_COLUMNS, DATE_COLUMN
+
+# columns a raw batch must have before anything else is checked
+REQUIRED_COLUMNS = {
+    "weather": ["date", "datatype", "station", "value", "city", "state"],
+    "energy": ["period", "respondent", "type", "timezone", "value", "city", "state"],
+}
+WEATHER_TYPES = ["TMAX", "TMIN"]
+ENERGY_TYPES = ["D", "NG"]
+# hard limits (°F) of a reading, around the North American records (-81°F, 134°F)
+DEFAULT_RANGES = {
+    "temp_min": -90.0,
+    "temp_max": 140.0,
+}
+
+
+def get_validation_settings(config_path):
+    with open(config_path) as f:
+        data = yaml.safe_load(f)
+    validation = data.get("validation") or {}
+    return {
+        "enabled": validation.get("enabled", True),
+        "quarantine_root": validation.get("quarantine_root", "./data/quarantine"),
+        "max_future_days": validation.get("max_future_days", 1),
+        "ranges": dict(DEFAULT_RANGES, **(validation.get("ranges") or {})),
+    }
+
+
+def validate_raw(kind, df, ranges=None, today=None, max_future_days=1):
+    """
+    splits a raw batch into (accepted, rejected). accepted rows are returned unchanged,
+    rejected rows get a reason column ("; " separated when several checks fail).
+    ranges -> hard temperature limits (DEFAULT_RANGES), the same for every city
+    """
+    missing = [col for col in REQUIRED_COLUMNS[kind] if col not in df.columns]
+    if missing:
+        return df.iloc[:0], df.assign(reason=f"missing column(s) {', '.join(missing)}")
+
+    today = pd.Timestamp(today or datetime.date.today())
+    dates = pd.to_datetime(df[DATE_COLUMN[kind]], format="ISO8601", errors="coerce")
+    values = pd.to_numeric(df["value"], errors="coerce").to_numpy(dtype=float)
+    ranges = dict(DEFAULT_RANGES, **(ranges or {}))
+
+    checks = [
+        ("unparseable date", dates.isna().to_numpy()),
+        ("future date", (dates > today + pd.Timedelta(days=max_future_days)).to_numpy()),
+        ("missing or non-numeric value", np.isnan(values)),
+    ]
+    if kind == "weather":
+        datatype = df["datatype"].astype(str).to_numpy()
+        checks += [
+            ("unexpected datatype", ~np.isin(datatype, WEATHER_TYPES)),
+            ("temperature above physical limit", values > ranges["temp_max"]),
+            ("temperature below physical limit", values < ranges["temp_min"]),
+        ]
+    else:
+        type = df["type"].astype(str).to_numpy()
+        checks += [
+            ("unexpected type", ~np.isin(type, ENERGY_TYPES)),
+        ]
+    checks.append(("duplicate in batch", df.duplicated(KEY_COLUMNS[kind], keep="first").to_numpy()))
+
+    reasons = np.full(len(df), "", dtype=object)
+    for reason, failed in checks:
+        reasons[failed] = np.where(reasons[failed] == "", reason, reasons[failed] + "; " + reason)
+    rejected = reasons != ""
+    return df[~rejected], df[rejected].assign(reason=reasons[rejected])
+
+
+def quarantine(kind, rejected, root="./data/quarantine"):
+    """appends rejected rows, with their reason and the time, to <root>/<kind>.csv"""
+    if rejected.empty:
+        return 0
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, f"{kind}.csv")
+    rows = rejected.assign(quarantined_at=datetime.datetime.now().isoformat(timespec="seconds"))
+    if os.path.exists(path):
+        columns = pd.read_csv(path, nrows=0).columns
+        if set(rows.columns) <= set(columns):
+            rows.reindex(columns=columns).to_csv(path, mode="a", header=False, index=False)
+            return len(rows)
+        # the API added a field since the file was started, rewrite it with the wider header
+        rows = pd.concat([pd.read_csv(path, dtype=str), rows], ignore_index=True)
+    rows.to_csv(path, index=False)
+    return len(rejected)
+
+
+def quarantine_summary(root="./data/quarantine"):
+    """[{source, reason, rows, last_quarantined}] of the quarantine files, for the dashboard"""
+    summary = []
+    for kind in REQUIRED_COLUMNS:
+        path = os.path.join(root, f"{kind}.csv")
+        if not os.path.exists(path):
+            continue
+        rows = pd.read_csv(path, usecols=["reason", "quarantined_at"], dtype=str)
+        counts = rows.groupby("reason").agg(rows=("reason", "size"), last=("quarantined_at", "max"))
+        for reason, row in counts.iterrows():
+            summary.append({
+                "source": kind, "reason": reason, "rows": int(row["rows"]), "last_quarantined": row["last"],
+            })
+    return summary
+
+
+class QualityGate:
+    """validates each fetched batch in run_pipeline before it reaches the raw store"""
+
+    def __init__(self, config_path):
+        self.settings = get_validation_settings(config_path)
+        self.counts = {}   # (kind, reason) -> rejected rows
+
+    def check(self, kind, df):
+        """rows that may be written; the rest is quarantined"""
+        if not self.settings["enabled"] or df.empty:
+            return df
+        accepted, rejected = validate_raw(
+            kind, df, self.settings["ranges"], max_future_days=self.settings["max_future_days"]
+        )
+        if not rejected.empty:
+            quarantine(kind, rejected, self.settings["quarantine_root"])
+            for reason, count in rejected["reason"].value_counts().items():
+                self.counts[(kind, reason)] = self.counts.get((kind, reason), 0) + int(count)
+        return accepted
+
+    def report(self):
+        if not self.counts:
+            return
+        print()
+        print(f"Quarantined rows ({self.settings['quarantine_root']}):")
+        for (kind, reason), count in sorted(self.counts.items()):
+            print(f"  {kind:<8} {count:>6}  {reason}")
@@ -0,0 +1,138 @@
+"""
+Last fetched date per source, city and type, kept in a small JSON manifest so the
+pipeline does not have to scan the raw data at startup.
+
+    python -m src.watermarks --verify    # compare the manifest with the raw data
+    python -m src.watermarks --rebuild   # reconstruct the manifest from the raw data
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+import pandas as pd
+
+from src.storage import open_raw_stores
+
+DEFAULT_PATH = "./data/raw/watermarks.json"
+# source -> (date column, type column) in the raw rows
+SOURCES = {"weather": ("date", "datatype"), "energy": ("period", "type")}
+
+
+def _max_dates(df, date_col, type_col):
+    """{city: {type: "YYYY-MM-DD"}} of the latest date in df"""
+    if df.empty:
+        return {}
+    dates = pd.to_datetime(df[date_col], format="ISO8601").dt.normalize()
+    latest = dates.groupby([df["city"].astype(str), df[type_col].astype(str)]).max()
+    marks = {}
+    for (city, type), date in latest.items():
+        marks.setdefault(city, {})[type] = str(date.date())
+    return marks
+
+
+class Watermarks:
+    """{"weather": {city: {datatype: date}}, "energy": {city: {type: date}}}"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.marks = {source: {} for source in SOURCES}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.marks.update(json.load(f))
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def save(self):
+        """atomic write: a crash mid-save leaves the previous manifest in place"""
+        folder = os.path.dirname(self.path) or "."
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.marks, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def advance(self, source, df):
+        """move the watermarks forward with rows that were just written, then save"""
+        date_col, type_col = SOURCES[source]
+        for city, types in _max_dates(df, date_col, type_col).items():
+            current = self.marks[source].setdefault(city, {})
+            for type, date in types.items():
+                if date > current.get(type, ""):
+                    current[type] = date
+        self.save()
+
+    def weather_dates(self):
+        """{city: Timestamp} in the shape get_weather_start_date expects"""
+        return {
+            city: pd.Timestamp(max(types.values()))
+            for city, types in self.marks["weather"].items() if types
+        }
+
+    def energy_dates(self):
+        """{(city, type): Timestamp} in the shape get_energy_start_date expects"""
+        return {
+            (city, type): pd.Timestamp(date)
+            for city, types in self.marks["energy"].items()
+            for type, date in types.items()
+        }
+
+
+def scan_watermarks(weather_store, energy_store):
+    """reads the raw data and returns what the manifest should contain"""
+    return {
+        "weather": _max_dates(weather_store.read(columns=["date", "city", "datatype"]), *SOURCES["weather"]),
+        "energy": _max_dates(energy_store.read(columns=["period", "city", "type"]), *SOURCES["energy"]),
+    }
+
+
+def rebuild_watermarks(weather_store, energy_store, path=DEFAULT_PATH):
+    marks = Watermarks(path)
+    marks.marks = scan_watermarks(weather_store, energy_store)
+    marks.save()
+    return marks
+
+
+def verify_watermarks(weather_store, energy_store, path=DEFAULT_PATH):
+    """returns a list of differences between the manifest and the raw data, empty when in sync"""
+    stored = Watermarks(path).marks
+    actual = scan_watermarks(weather_store, energy_store)
+    problems = []
+    for source in SOURCES:
+        cities = set(stored.get(source, {})) | set(actual[source])
+        for city in sorted(cities):
+            types = set(stored.get(source, {}).get(city, {})) | set(actual[source].get(city, {}))
+            for type in sorted(types):
+                have = stored.get(source, {}).get(city, {}).get(type)
+                want = actual[source].get(city, {}).get(type)
+                if have != want:
+                    problems.append(f"{source} {city} {type}: manifest has {have}, data has {want}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verify or rebuild the raw data watermark manifest")
+    parser.add_argument("--config", default="./config/config.yaml")
+    parser.add_argument("--path", default=DEFAULT_PATH)
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--verify", action="store_true")
+    action.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args(argv)
+
+    weather_store, energy_store = open_raw_stores(args.config)
+    if args.rebuild:
+        rebuild_watermarks(weather_store, energy_store, args.path)
+        print(f"Rebuilt {args.path}")
+        return 0
+
+    problems = verify_watermarks(weather_store, energy_store, args.path)
+    for problem in problems:
+        print(problem)
+    print("Watermarks are in sync." if not problems else f"{len(problems)} watermark(s) out of sync.")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
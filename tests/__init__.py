@@ -0,0 +1,24 @@
+import os
+import tempfile
+import unittest
+
+from benchmarks.synthetic import synthetic_cities, synthetic_raw, write_config
+from src.storage import open_raw_stores
+
+
+class RawDataTestCase(unittest.TestCase):
+    """
+    a temporary directory, removed after each test, with a config for two synthetic cities,
+    a year of their raw rows (self.weather, self.energy) and empty CSV raw stores
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.workdir = tmp.name
+        self.cities = synthetic_cities(2)
+        self.weather, self.energy = synthetic_raw(self.cities, years=1, end="2026-10-10")
+        self.config_path = write_config(self.workdir, self.cities, backend="csv")
+        raw_dir = os.path.join(self.workdir, "raw")
+        os.makedirs(raw_dir)
+        self.weather_store, self.energy_store = open_raw_stores(self.config_path, raw_dir)
@@ -0,0 +1,89 @@
+import os
+import unittest
+
+import numpy as np
+
+from src.artifacts import build_artifacts, ensure_artifacts, is_current
+from src.validation import QualityGate
+from src.transform import build_processed, add_deltas, upsert_processed
+from tests import RawDataTestCase
+
+
+class IncrementalQualityTest(RawDataTestCase):
+    """quality findings kept across incremental artifact builds"""
+
+    def setUp(self):
+        super().setUp()
+        self.weather_store.append(self.weather)
+        self.energy_store.append(self.energy)
+        self.processed = build_processed(self.weather_store, self.energy_store)
+        self.processed_path = os.path.join(self.workdir, "weather_energy_data.csv")
+        self.out_dir = os.path.join(self.workdir, "artifacts")
+
+    def test_upsert_clears_fixed_missing_value(self):
+        # an older day already has a missing TMIN
+        self.processed.loc[self.processed.index[0], "TMIN"] = np.nan
+        add_deltas(self.processed).to_csv(self.processed_path, index=False)
+        artifacts = build_artifacts(self.processed_path, self.config_path, self.out_dir)
+        self.assertEqual(len(artifacts["missing"]), 1)
+
+        # a run re-fetches a day that comes back without TMAX, it is reported as missing
+        row = self.processed.index[-5]
+        broken = self.processed.loc[[row]].assign(TMAX=np.nan)
+        upsert_processed(broken, self.processed_path)
+        artifacts = build_artifacts(self.processed_path, self.config_path, self.out_dir, new_rows=broken)
+        self.assertEqual(len(artifacts["missing"]), 2)
+
+        # the next run gets the TMAX, only the upserted row is checked and the finding goes away
+        fixed = self.processed.loc[[row]]
+        upsert_processed(fixed, self.processed_path)
+        artifacts = build_artifacts(self.processed_path, self.config_path, self.out_dir, new_rows=fixed)
+        self.assertEqual(len(artifacts["missing"]), 1)
+        self.assertEqual(artifacts["freshness"]["summary"]["missing"], 1)
+
+    def test_incremental_findings_keep_date_format(self):
+        broken = self.processed.copy()
+        broken.loc[broken.index[:3], "Demand"] = -1.0
+        add_deltas(broken).to_csv(self.processed_path, index=False)
+        build_artifacts(self.processed_path, self.config_path, self.out_dir)
+
+        # a new outlier on another day is merged with the stored ones
+        upserted = self.processed.loc[[self.processed.index[-1]]].assign(Demand=-2.0)
+        upsert_processed(upserted, self.processed_path)
+        artifacts = build_artifacts(self.processed_path, self.config_path, self.out_dir, new_rows=upserted)
+
+        with open(os.path.join(self.out_dir, "outliers.csv")) as f:
+            dates = [line.split(",", 1)[0] for line in f.read().splitlines()[1:]]
+        self.assertEqual(len(dates), 4)
+        self.assertTrue(all(len(date) == 10 for date in dates), dates)
+        self.assertEqual(dates, sorted(dates))
+
+
+class QuarantineReportTest(RawDataTestCase):
+    """rows the validation gate rejects are counted in the artifacts"""
+
+    def test_quarantine_counts_in_freshness(self):
+        self.weather_store.append(self.weather)
+        self.energy_store.append(self.energy)
+        processed_path = os.path.join(self.workdir, "weather_energy_data.csv")
+        add_deltas(build_processed(self.weather_store, self.energy_store)).to_csv(processed_path, index=False)
+        out_dir = os.path.join(self.workdir, "artifacts")
+        build_artifacts(processed_path, self.config_path, out_dir)
+
+        # a no-new-data run can still quarantine rows, the stored artifacts are then out of date
+        gate = QualityGate(self.config_path)
+        batch = self.weather.tail(3).assign(value=[150.0, 5.0, -95.0])
+        accepted = gate.check("weather", batch)
+        self.assertEqual(accepted["value"].tolist(), [5.0])
+        self.assertFalse(is_current(processed_path, self.config_path, out_dir))
+
+        freshness = ensure_artifacts(processed_path, self.config_path, out_dir)["freshness"]
+        self.assertEqual(freshness["summary"]["quarantined"], 2)
+        self.assertEqual(
+            sorted((row["reason"], row["rows"]) for row in freshness["quarantine"]),
+            [("temperature above physical limit", 1), ("temperature below physical limit", 1)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import json
+import time
+import datetime
+import tempfile
+import unittest
+
+from src.cache import ResponseCache, REVALIDATE_SECONDS
+
+URL = "https://api.example/data"
+
+
+def days_ago(days):
+    return str(datetime.date.today() - datetime.timedelta(days=days))
+
+
+class ResponseCacheTest(unittest.TestCase):
+    """keys that repeat across daily runs, and pruning of expired recent entries"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.cache = ResponseCache(self.root, recent_days=3, recent_ttl=3600)
+
+    def test_split_range_keeps_the_final_part_stable(self):
+        today = datetime.date.today()
+        boundary = (today - datetime.timedelta(days=3)).replace(day=1)
+        start = str(boundary - datetime.timedelta(days=40))
+
+        parts = self.cache.split_range(start, str(today))
+
+        self.assertEqual(parts, [
+            (start, str(boundary - datetime.timedelta(days=1))),
+            (str(boundary), str(today)),
+        ])
+        # the final part is stored as final, so the next run is served from the cache
+        entry = self.cache.put(URL, {"startdate": parts[0][0], "enddate": parts[0][1]}, {"results": []})
+        self.assertTrue(entry["final"])
+        # nothing to split when the whole range is recent
+        self.assertEqual(self.cache.split_range(str(boundary), str(today)), [(str(boundary), str(today))])
+
+    def test_expired_recent_entries_are_pruned(self):
+        old = {"startdate": days_ago(2), "enddate": days_ago(0)}
+        validated = {"startdate": days_ago(1), "enddate": days_ago(0)}
+        self.cache.put(URL, old, {"results": [1]})
+        self.cache.put(URL, validated, {"results": [2]}, {"ETag": '"v1"'})
+        self._age(old, 2 * 3600)
+        self._age(validated, 2 * 3600)
+
+        # expired without validators: removed on read
+        self.assertIsNone(self.cache.get(URL, old))
+        # expired with an ETag: kept for a conditional request
+        self.assertEqual(self.cache.get(URL, validated)["etag"], '"v1"')
+
+        # the next run prunes what is past revalidation on its first recent put
+        self._age(validated, REVALIDATE_SECONDS + 1)
+        self.cache = ResponseCache(self.root, recent_days=3, recent_ttl=3600)
+        self.cache.put(URL, {"startdate": days_ago(0), "enddate": days_ago(0)}, {"results": []})
+        self.assertFalse(os.path.exists(self._path(validated)))
+
+    def _path(self, params):
+        return self.cache._path(self.cache.key(URL, params), final=False)
+
+    def _age(self, params, seconds):
+        path = self._path(params)
+        with open(path) as f:
+            entry = json.load(f)
+        entry["stored_at"] = time.time() - seconds
+        with open(path, "w") as f:
+            json.dump(entry, f)
+
+
+if __name__ == "__main__":
+    unittest.main()
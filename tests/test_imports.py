@@ -0,0 +1,41 @@
+import os
+import sys
+import json
+import unittest
+import subprocess
+
+from benchmarks.run import IMPORT_BUDGETS, REPO_ROOT
+
+# rendering and modelling packages the cron job and batch tools must not load
+HEAVY_MODULES = ["streamlit", "plotly", "pydeck", "statsmodels"]
+
+
+def cold_import(module):
+    """(seconds, heavy modules loaded) of importing `module` in a fresh interpreter without API credentials"""
+    env = {key: value for key, value in os.environ.items() if key not in ("NAOO_TOKEN", "EIA_KEY")}
+    code = (
+        "import sys, json, time; t = time.perf_counter(); "
+        f"import {module}; seconds = time.perf_counter() - t; "
+        f"print(json.dumps([seconds, [m for m in {HEAVY_MODULES!r} if m in sys.modules]]))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+class ImportBudgetTest(unittest.TestCase):
+    """headless modules import quickly, without credentials and without the dashboard stack"""
+
+    def test_headless_imports(self):
+        for module in ["src.analysis", "src.artifacts", "weather_energy_pipeline"]:
+            with self.subTest(module=module):
+                # best of three, a single cold import can hit a slow disk
+                runs = [cold_import(module) for _ in range(3)]
+                seconds = min(run[0] for run in runs)
+                self.assertLess(seconds, IMPORT_BUDGETS[module])
+                self.assertEqual(runs[0][1], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+import pandas as pd
+
+from src.transform import build_processed
+from tests import RawDataTestCase
+
+
+class BuildProcessedKeysTest(RawDataTestCase):
+    """incremental pivots of (date, city) keys whose weather is missing or incomplete"""
+
+    def keys(self, *dates):
+        city = self.cities[0]["city"]
+        return pd.DataFrame({"date": list(dates), "city": city})
+
+    def test_energy_only_keys(self):
+        # EIA published the day, NOAA has not posted it yet
+        self.weather_store.append(self.weather[self.weather["date"] < "2026-10-10"])
+        self.energy_store.append(self.energy)
+
+        merged = build_processed(self.weather_store, self.energy_store, keys=self.keys("2026-10-10"))
+
+        self.assertTrue(merged.empty)
+        self.assertTrue({"TMAX", "TMIN", "TAVG", "Demand"} <= set(merged.columns))
+
+    def test_tmin_only_keys(self):
+        self.weather_store.append(self.weather[self.weather["datatype"] == "TMIN"])
+        self.energy_store.append(self.energy)
+
+        merged = build_processed(self.weather_store, self.energy_store, keys=self.keys("2026-10-09", "2026-10-10"))
+
+        self.assertEqual(len(merged), 2)
+        self.assertTrue(merged["TMAX"].isna().all())
+        self.assertTrue(merged["TAVG"].isna().all())
+        self.assertTrue(merged["TMIN"].notna().all())
+        self.assertTrue(merged["Demand"].notna().all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,193 +1,253 @@
 import os
-from dotenv import load_dotenv
 import pandas as pd
-import datetime, time
+import datetime
+import requests
 # from pathlib import path
 
 from src.data_fetcher import (
-    get_weather_dates_per_city,
-    get_energy_dates_per_city,
     get_cities,
+    get_fetch_settings,
     get_weather_start_date,
     get_energy_start_date,
-    fetch_weather_data,
-    fetch_energy_data
+    iter_weather_results,
+    fetch_energy_data,
+    fetch_energy_batch,
+    split_energy_by_city,
+    energy_rows,
+    configure_endpoints
 )
-
-
-load_dotenv()
-NAOO_TOKEN = os.environ["NAOO_TOKEN"]
-EIA = os.getenv("EIA_KEY")
-
-
-with open("./logs/cron_test.log", "a") as f:
-    f.write(f"🚀 Script started at {datetime.datetime.now()}\n")
+from src.cache import ResponseCache
+from src.http_client import configure_client
+from src.scheduler import FetchScheduler
+from src.storage import open_raw_stores
+from src.watermarks import Watermarks, rebuild_watermarks
+from src.artifacts import build_artifacts, ensure_artifacts
+from src.validation import QualityGate
+from src.transform import build_processed, upsert_processed, add_deltas, get_processing_settings
+from src.metrics import start_run, span, get_metrics_settings
 
 
 def run_pipeline():
     #step 1: determine dates
     today = str(datetime.date.today())
+    # timing spans of every stage, written to the run report at the end (see src/metrics.py)
+    metrics = get_metrics_settings("./config/config.yaml")
+    run = None
+    if metrics["enabled"]:
+        run = start_run(metrics["report_path"], metrics["prometheus_textfile"])
     
-    if os.path.exists("./data/raw"):
-        weather_dates_per_city = get_weather_dates_per_city("./data/raw/all_weather.csv")
-        energy_dates_per_city = get_energy_dates_per_city("./data/raw/all_energy.csv")
-        # print(weather_dates_per_city) #for debugging
-        # print(
-        # print(energy_dates_per_city)
+    weather_store, energy_store = open_raw_stores("./config/config.yaml")
+    # last fetched dates come from the watermark manifest, the raw data is only
+    # scanned once to create it
+    watermarks = Watermarks()
+    if not watermarks.exists():
+        print("No watermark manifest yet, building it from the raw data...")
+        watermarks = rebuild_watermarks(weather_store, energy_store)
+    weather_dates_per_city = watermarks.weather_dates()
+    energy_dates_per_city = watermarks.energy_dates()
 
     
-    #step 2: get cities, fetch current weather data and store in csv
+    #step 2: get cities and fetch settings
     # if not os.path.exists("./config/config.yaml"):
         # raise FileNotFoundError(f"Config not found at ./config/config.yaml...")
     cities = get_cities("./config/config.yaml")
-    
-    
-    for city_info in cities:
-        city = city_info["city"]
-        state = city_info["state"]
-        station = city_info["station"]
-        
-        #get start date
-        start_date =  get_weather_start_date(city=city, date_dict=weather_dates_per_city)
-        if start_date >= today:
-            print(f"Data for {city} is up-to-date.")
-            continue
-        
-        print(f"Fetching data for {city}...{start_date} - {today}")
-        weather_result = fetch_weather_data(station=station, start=start_date, end=today)
-        # print("Raw weather response:", weather_result)
-    
+    settings = get_fetch_settings("./config/config.yaml")
+    cache = None
+    if settings["cache"].get("enabled", True):
+        cache = ResponseCache(
+            root=settings["cache"].get("root", "./data/cache"),
+            recent_days=settings["cache"].get("recent_days", 3),
+            recent_ttl=settings["cache"].get("recent_ttl_hours", 6) * 3600,
+            offline=settings["cache"].get("offline", False),
+        )
+    configure_client(cache=cache, **settings["http"])
+    configure_endpoints(**settings["endpoints"])
+    types = ["D", "NG"]
+    # every fetched batch is validated before it is written, failures go to data/quarantine
+    gate = QualityGate("./config/config.yaml")
+
+    # schedule every weather and energy request up front, the scheduler runs them
+    # in parallel while keeping each API within its rate budget
+    weather_jobs = []
+    energy_jobs = []
+    new_keys = []   # (date, city) of every row written in this run
+    with FetchScheduler(settings["rate_limits"], settings["max_workers"]) as scheduler:
+        for city_info in cities:
+            city = city_info["city"]
+            station = city_info["station"]
 
-        if weather_result and "results" in weather_result and weather_result["results"]:
-            weather_df = pd.DataFrame(weather_result["results"])
-            weather_df["city"] = city
-            weather_df["state"] = state
-            weather_df.to_csv(
-                "./data/raw/all_weather.csv", 
-                mode="a", 
-                header=False,
-                index=False
-            )        
-            print(f"Saved {len(weather_df)} rows for {city}. Sleeping for 10 Seconds…")
-            print()
-        else:
-        
-            print(f"⚠️ Warning: No weather data for {city}. Skipping...")
-            print()
-            continue
-            
-        
-        
-        # print("-"*50)
-        time.sleep(10)
-        
-   
-    # step 3  fetch current energy data and store in csv
-    print()
-    print("Retrieving energy data......")
-    for city_info in cities:
-        city = city_info["city"]
-        state = city_info["state"]
-        region = city_info["region"]
-        timezone = city_info["timezone"]
-        types = ["D", "NG"]
-        
-        for type in types:
             #get start date
-            energy_start_date = get_energy_start_date(city=city, type=type, date_dict=energy_dates_per_city)
-            if energy_start_date >= today:
-                print()
-                print(f"Data for {city} is up-to-date")
+            start_date =  get_weather_start_date(city=city, date_dict=weather_dates_per_city)
+            if start_date >= today:
+                print(f"Data for {city} is up-to-date.")
                 continue
-            print(f"Fetching data for {city}...{energy_start_date} - {today}")   
-            energy_result = fetch_energy_data(region=region, types=type, timezone=timezone, start=energy_start_date, end=today)
-    
-              
-            if energy_result: #and "response" in energy_result and energy_result["response"]["data"]:
-                data = energy_result["response"]["data"] 
-                
-                energy_df = pd.DataFrame(data)
-                energy_df["city"] = city
-                energy_df["state"] = state
-        
-                # Write to CSV with mode (w) at the first loop, then (a) for subsequent loops
-                energy_df.to_csv("./data/raw/all_energy.csv",
-                mode = "a",
-                header = False,
-                index = False
+
+            print(f"Fetching data for {city}...{start_date} - {today}")
+            pages = scheduler.stream(
+                "noaa", f"weather {city}", iter_weather_results,
+                station=station, start=start_date, end=today
+            )
+            weather_jobs.append((city_info, pages))
+
+        energy_starts = []
+        for city_info in cities:
+            city = city_info["city"]
+            for type in types:
+                #get start date
+                energy_start_date = get_energy_start_date(city=city, type=type, date_dict=energy_dates_per_city)
+                if energy_start_date >= today:
+                    print(f"Data for {city} is up-to-date")
+                    continue
+                print(f"Fetching {type} data for {city}...{energy_start_date} - {today}")
+                energy_starts.append((city_info, type, energy_start_date))
+
+        if energy_starts and settings["energy_batch"]:
+            # one paged request covers every city and type, rows are split per city when written
+            batch = scheduler.submit(
+                "eia", "energy batch", fetch_energy_batch,
+                regions=[c["region"] for c, _, _ in energy_starts],
+                types=[t for _, t, _ in energy_starts],
+                timezones=[c["timezone"] for c, _, _ in energy_starts],
+                start=min(start for _, _, start in energy_starts), end=today
+            )
+            energy_jobs = [(c, t, start, batch) for c, t, start in energy_starts]
+        else:
+            for city_info, type, energy_start_date in energy_starts:
+                future = scheduler.submit(
+                    "eia", f"energy {city_info['city']} {type}", fetch_energy_data,
+                    region=city_info["region"], types=type, timezone=city_info["timezone"],
+                    start=energy_start_date, end=today
                 )
-                print(f"Saved {len(energy_df)} - {type} rows for {city}.")   
+                energy_jobs.append((city_info, type, energy_start_date, future))
+
+        # step 3: write results in config order so the raw CSVs come out exactly as
+        # the sequential loop used to write them (parquet store gets the same rows)
+        # weather windows are written as they arrive, long backfills stream to disk
+        for city_info, pages in weather_jobs:
+            city = city_info["city"]
+            saved = 0
+            try:
+                for results in pages:
+                    if not results:
+                        continue
+                    with span("parse", source="noaa", city=city, rows=len(results)):
+                        weather_df = pd.DataFrame(results)
+                        weather_df["city"] = city
+                        weather_df["state"] = city_info["state"]
+                    with span("validate", source="noaa", city=city) as record:
+                        weather_df = gate.check("weather", weather_df)
+                        record["rows"] = len(weather_df)
+                    # rows already in the raw store are skipped, only new ones come back
+                    with span("write", source="noaa", city=city) as record:
+                        weather_df = weather_store.append(weather_df)
+                        record["rows"] = len(weather_df)
+                    if weather_df.empty:
+                        continue
+                    watermarks.advance("weather", weather_df)
+                    new_keys.append(weather_df[["date", "city"]])
+                    saved += len(weather_df)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"⚠️ Warning: weather request for {city} failed: {e}. Skipping...")
+                continue
+
+            if saved:
+                print(f"Saved {saved} rows for {city}.")
             else:
-                print(f"⚠️ Warning: {type} Energy report unavailable for {city}. Skipping...")
-                print()
+                print(f"⚠️ Warning: No new weather data for {city}. Skipping...")
+
+        print()
+        print("Retrieving energy data......")
+        batch_rows = None
+        for city_info, type, energy_start_date, future in energy_jobs:
+            city = city_info["city"]
+            try:
+                energy_result = future.result()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"⚠️ Warning: {type} energy request for {city} failed: {e}. Skipping...")
                 continue
-        
-    
-        print("Sleeping for 10 seconds")        
-        # print()
-        # time.sleep(10)
+
+            with span("parse", source="eia", city=city, type=type) as record:
+                if settings["energy_batch"] and energy_result:
+                    if batch_rows is None:
+                        batch_rows = split_energy_by_city(energy_rows(energy_result), cities)
+                    rows = [
+                        row for row in batch_rows.get((city, type), [])
+                        if row["period"] >= energy_start_date
+                    ]
+                    energy_result = {"response": {"data": rows}}
+
+                data = energy_rows(energy_result)
+                if data:
+                    energy_df = pd.DataFrame(data)
+                    energy_df["city"] = city
+                    energy_df["state"] = city_info["state"]
+                record["rows"] = len(data)
+            if data:
+                with span("validate", source="eia", city=city, type=type) as record:
+                    energy_df = gate.check("energy", energy_df)
+                    record["rows"] = len(energy_df)
+                with span("write", source="eia", city=city, type=type) as record:
+                    energy_df = energy_store.append(energy_df)
+                    record["rows"] = len(energy_df)
+                if not energy_df.empty:
+                    watermarks.advance("energy", energy_df)
+                    new_keys.append(energy_df[["period", "city"]].rename(columns={"period": "date"}))
+                print(f"Saved {len(energy_df)} - {type} rows for {city}.")
+            else:
+                print(f"⚠️ Warning: {type} Energy report unavailable for {city}. Skipping...")
+
+    scheduler.report()
+    gate.report()
     print("Data retriever done...")
 
     #  now that the data has been retrieved, it is time to pivot and merge
-    weather = pd.read_csv("./data/raw/all_weather.csv")
-    weather["date"] = pd.to_datetime(weather["date"]).dt.date   # convert to proper date format
-    weather_pivot = weather.pivot_table(
-        index=["date", "city", "state"],
-        columns="datatype",
-        values="value"
-    ).reset_index()
-    
-    # Calculate average temperature
-    weather_pivot['TAVG'] = (weather_pivot['TMAX'] + weather_pivot['TMIN']) / 2
-    
-    energy = pd.read_csv("./data/raw/all_energy.csv")
-    # # rename period to date and convert to proper date format
-    energy_df = energy.rename(columns={"period":"date"})
-    energy_df["date"] = pd.to_datetime(energy_df["date"]).dt.date
-    energy_pivot = energy_df.pivot_table(
-        index= ['date', 'respondent-name', "timezone", "city", "state", "value-units"],
-        columns=["type-name"],
-        values="value"
-    ).reset_index()
-
-    merged = pd.merge(weather_pivot, energy_pivot, on=["date", "city", "state"], how="inner")
-    
     output_path="./data/processed/weather_energy_data.csv"
+    mode = get_processing_settings("./config/config.yaml")["mode"]
+    upserted = None
+    if mode == "incremental" and os.path.exists(output_path):
+        # only the (date, city) keys fetched in this run are pivoted and upserted
+        if new_keys:
+            merged = build_processed(weather_store, energy_store, keys=pd.concat(new_keys, ignore_index=True))
+            with span("write_processed", rows=len(merged)) as record:
+                written = upsert_processed(merged, output_path)
+                record["bytes"] = os.path.getsize(output_path)
+            upserted = merged
+            print(f"Upserted {written} processed rows.")
+        else:
+            print("No new data, processed output unchanged.")
+    else:
+        merged = build_processed(weather_store, energy_store)
+        with span("deltas", rows=len(merged)):
+            merged = add_deltas(merged)
+        with span("write_processed", rows=len(merged)) as record:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            merged.to_csv(output_path, index=False)
+            record["bytes"] = os.path.getsize(output_path)
+
+    # dashboard aggregates (daily series, regression sums, heatmap cube, quality reports);
+    # after an upsert only the upserted rows are quality checked; when the processed file
+    # did not change (no new data) the stored artifacts are still current and kept
     if os.path.exists(output_path):
-        os.remove(output_path)
-    merged.to_csv(output_path, index=False)
-        
-    #     existing = pd.read_csv(output_path)
-    #     existing["date"] = pd.to_datetime(existing["date"]).dt.date
-
-    #     # Filter out already existing rows
-    #     merged["date"] = pd.to_datetime(merged["date"]).dt.date
-    #     merged_key = merged[["date", "city", "state"]].astype(str)
-    #     existing_key = existing[["date", "city", "state"]].astype(str)
-
-    #     # Create a mask for new rows not already in the file
-    #     mask = ~merged_key.apply(tuple, axis=1).isin(existing_key.apply(tuple, axis=1))
-    #     new_rows = merged[mask]
-
-    #     # Combine and save
-    #     combined = pd.concat([existing, new_rows], ignore_index=True)
-    # else:
-    #     combined = merged
+        with span("artifacts"):
+            if upserted is not None:
+                build_artifacts(output_path, "./config/config.yaml", new_rows=upserted)
+            else:
+                ensure_artifacts(output_path, "./config/config.yaml")
 
-    #     combined.to_csv(output_path, index=False)
+    if run is not None:
+        print()
+        run.report(run.finish())
+        if metrics["report_path"]:
+            print(f"Run report appended to {metrics['report_path']}")
 
-    
-    #     existing = pd.read_csv("./data/processed/weather_energy_data.csv")
-    #     combined = pd.concat([existing, merged]).drop_duplicates(subset=["date", "city", "state"])
-    # else:
-    #     combined = merged
-        
-    # combined.to_csv("./data/processed/weather_energy_data.csv", index=False)
     print()
     print("completed task")
     
     
 if __name__ == "__main__":
+    with open("./logs/cron_test.log", "a") as f:
+        f.write(f"🚀 Script started at {datetime.datetime.now()}\n")
     run_pipeline()
     
     
\ No newline at end of file